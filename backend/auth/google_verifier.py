@@ -0,0 +1,85 @@
+import re
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+from google.auth import jwt as google_jwt
+from backend.services.http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+# Used when Google's response carries no usable Cache-Control max-age
+DEFAULT_CERTS_TTL = 3600
+CLOCK_SKEW_SECONDS = 10
+# Unknown key ids force a refetch at most this often, so forged kids cannot hammer
+# Google or queue every login behind the refresh lock
+CERTS_MIN_REFRESH_INTERVAL = 60
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+class GoogleTokenVerifier:
+    """
+    Async replacement for id_token.verify_oauth2_token. Google's signing certs are
+    fetched with the shared HTTP client and kept until their Cache-Control max-age
+    runs out, so a login only does a local signature check.
+    """
+
+    def __init__(self, certs_url: str = GOOGLE_CERTS_URL, min_refresh_interval: float = CERTS_MIN_REFRESH_INTERVAL):
+        self.certs_url = certs_url
+        self.min_refresh_interval = min_refresh_interval
+        self._certs: Optional[Dict[str, str]] = None
+        self._expires_at = 0.0
+        self._fetched_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _refresh_allowed(self) -> bool:
+        return time.monotonic() - self._fetched_at >= self.min_refresh_interval
+
+    async def _fetch_certs(self) -> None:
+        # Counted from the attempt, so a failing endpoint is not retried on every login either
+        self._fetched_at = time.monotonic()
+        response = await http_client.get().get(self.certs_url)
+        response.raise_for_status()
+        match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+        ttl = int(match.group(1)) if match else DEFAULT_CERTS_TTL
+        self._certs = response.json()
+        self._expires_at = time.monotonic() + ttl
+        logger.info(f"Refreshed Google signing certs, valid for {ttl}s")
+
+    async def _get_certs(self, kid: Optional[str], force: bool = False) -> Dict[str, str]:
+        if not force and self._certs is not None and time.monotonic() < self._expires_at:
+            return self._certs
+        async with self._lock:
+            # Another login may have refreshed them while we waited
+            fresh = self._certs is not None and time.monotonic() < self._expires_at
+            if not fresh or (force and kid not in self._certs and self._refresh_allowed()):
+                try:
+                    await self._fetch_certs()
+                except Exception as e:
+                    if self._certs is None:
+                        raise ValueError(f"Could not fetch Google certificates: {str(e)}")
+                    logger.error(f"Google cert refresh failed, using cached certs: {str(e)}")
+        return self._certs
+
+    async def verify(self, token: str, audience: Optional[str]) -> dict:
+        """Verify a Google ID token and return its claims. Raises ValueError if invalid."""
+        kid = google_jwt.decode_header(token).get("kid")
+        if not kid:
+            raise ValueError("Token has no key id")
+        certs = await self._get_certs(kid)
+        if kid not in certs:
+            if not self._refresh_allowed():
+                raise ValueError(f"Unknown signing key {kid}")
+            # Google rotated its keys before our cached copy expired
+            certs = await self._get_certs(kid, force=True)
+            if kid not in certs:
+                raise ValueError(f"Unknown signing key {kid}")
+
+        idinfo = google_jwt.decode(token, certs=certs, audience=audience, clock_skew_in_seconds=CLOCK_SKEW_SECONDS)
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+        return idinfo
+
+google_verifier = GoogleTokenVerifier()
@@ -1,6 +1,8 @@
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Annotated
+from typing import Annotated, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
@@ -14,15 +16,53 @@ JWT_SECRET = os.getenv("JWT_SECRET", "supersecretkey")
 JWT_EXPIRY_HOURS = int(os.getenv("JWT_EXPIRY_HOURS", "24"))
 ALGORITHM = "HS256"
 
+# Authenticated user lookups are cached in-process for USER_CACHE_TTL seconds
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+# Tokens younger than this are trusted without any DB lookup (0 disables)
+AUTH_TRUST_CLAIMS_SECONDS = int(os.getenv("AUTH_TRUST_CLAIMS_SECONDS", "0"))
+
 security = HTTPBearer()
 
-def create_access_token(user_id: str, email: str) -> str:
+class UserCache:
+    """Small TTL cache of user rows keyed by user_id."""
+
+    def __init__(self, ttl: int = USER_CACHE_TTL, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._data.get(user_id)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._data[user_id]
+            return None
+        return dict(user)
+
+    def set(self, user_id: str, user: dict) -> None:
+        self._data.pop(user_id, None)
+        self._data[user_id] = (dict(user), time.monotonic() + self.ttl)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id) -> None:
+        self._data.pop(str(user_id), None)
+
+user_cache = UserCache()
+
+def create_access_token(user_id: str, email: str, name: Optional[str] = None, avatar_url: Optional[str] = None) -> str:
     utc_now = datetime.utcnow()
     expire = utc_now + timedelta(hours=JWT_EXPIRY_HOURS)
     
+    # Profile fields ride along so trusted fresh tokens resolve to the full user without the DB
     payload = {
         "user_id": str(user_id),
         "email": email,
+        "name": name,
+        "avatar_url": avatar_url,
         "exp": expire,
         "iat": utc_now
     }
@@ -58,15 +98,27 @@ async def get_current_user(credentials: Annotated[HTTPAuthorizationCredentials,
     # and "returns user dict" for get_current_user. 
     # Let's import get_db and fetch the user.
     from backend.database import db
+
+    user_id = payload.get("user_id")
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    # A freshly issued token was just checked against the DB at login. Tokens from
+    # before profile claims were added carry no name and go to the DB instead.
+    if (AUTH_TRUST_CLAIMS_SECONDS and "name" in payload
+            and time.time() - payload.get("iat", 0) < AUTH_TRUST_CLAIMS_SECONDS):
+        return {"id": user_id, "email": payload.get("email"), "name": payload.get("name"), "avatar_url": payload.get("avatar_url")}
     
     try:
-        async with db.pool.acquire() as connection:
+        async with db.acquire() as connection:
             user = await connection.fetchrow(
                 "SELECT id, email, name, avatar_url FROM users WHERE id = $1",
-                payload.get("user_id")
+                user_id
             )
             if not user:
                 raise HTTPException(status_code=401, detail="User not found")
+            user_cache.set(user_id, dict(user))
             return dict(user)
     except Exception as e:
         if isinstance(e, HTTPException):
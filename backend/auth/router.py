@@ -1,11 +1,12 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, EmailStr
 from passlib.context import CryptContext
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 from backend.database import get_db
-from backend.auth.jwt_handler import create_access_token, get_current_user
+from backend.auth.jwt_handler import create_access_token, get_current_user, user_cache
+from backend.auth.google_verifier import google_verifier
 import asyncpg
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -14,6 +15,11 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 
+# bcrypt is deliberately slow (~100ms+ of CPU); it runs on a small dedicated pool so
+# a burst of logins queues there instead of blocking the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
 class SignupRequest(BaseModel):
     name: str
     email: EmailStr
@@ -32,6 +38,14 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
 @router.post("/signup", status_code=status.HTTP_201_CREATED)
 async def signup(user_data: SignupRequest, db: asyncpg.Connection = Depends(get_db)):
     # Check if email exists
@@ -39,7 +53,7 @@ async def signup(user_data: SignupRequest, db: asyncpg.Connection = Depends(get_
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
         
-    hashed_pwd = get_password_hash(user_data.password)
+    hashed_pwd = await get_password_hash_async(user_data.password)
     
     # Insert new user
     row = await db.fetchrow(
@@ -51,7 +65,7 @@ async def signup(user_data: SignupRequest, db: asyncpg.Connection = Depends(get_
         user_data.email, user_data.name, hashed_pwd
     )
     
-    access_token = create_access_token(row['id'], row['email'])
+    access_token = create_access_token(row['id'], row['email'], row['name'], row['avatar_url'])
     
     return {
         "access_token": access_token,
@@ -71,13 +85,13 @@ async def login(credentials: LoginRequest, db: asyncpg.Connection = Depends(get_
             detail="Incorrect email or password",
         )
         
-    if not verify_password(credentials.password, user['password_hash']):
+    if not await verify_password_async(credentials.password, user['password_hash']):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
         
-    access_token = create_access_token(user['id'], user['email'])
+    access_token = create_access_token(user['id'], user['email'], user['name'], user['avatar_url'])
     
     return {
         "access_token": access_token,
@@ -92,10 +106,8 @@ async def login(credentials: LoginRequest, db: asyncpg.Connection = Depends(get_
 @router.post("/google")
 async def google_auth(request: GoogleLoginRequest, db: asyncpg.Connection = Depends(get_db)):
     try:
-        # Verify Google token
-        idinfo = id_token.verify_oauth2_token(
-            request.google_token, google_requests.Request(), GOOGLE_CLIENT_ID
-        )
+        # Verify Google token (cached signing certs, no network fetch per login)
+        idinfo = await google_verifier.verify(request.google_token, GOOGLE_CLIENT_ID)
         
         email = idinfo.get("email")
         name = idinfo.get("name")
@@ -112,7 +124,7 @@ async def google_auth(request: GoogleLoginRequest, db: asyncpg.Connection = Depe
         )
         
         if user:
-            access_token = create_access_token(user['id'], user['email'])
+            access_token = create_access_token(user['id'], user['email'], user['name'], user['avatar_url'])
             return {"access_token": access_token, "user": dict(user)}
             
         # 2. Check if user exists by email (link accounts)
@@ -131,7 +143,9 @@ async def google_auth(request: GoogleLoginRequest, db: asyncpg.Connection = Depe
                 """,
                 google_id, picture, user_by_email['id']
             )
-            access_token = create_access_token(updated_user['id'], updated_user['email'])
+            # Profile changed, drop any cached copy
+            user_cache.invalidate(updated_user['id'])
+            access_token = create_access_token(updated_user['id'], updated_user['email'], updated_user['name'], updated_user['avatar_url'])
             return {"access_token": access_token, "user": dict(updated_user)}
             
         # 3. Neither -> create new user
@@ -144,7 +158,7 @@ async def google_auth(request: GoogleLoginRequest, db: asyncpg.Connection = Depe
             email, name, google_id, picture
         )
         
-        access_token = create_access_token(new_user['id'], new_user['email'])
+        access_token = create_access_token(new_user['id'], new_user['email'], new_user['name'], new_user['avatar_url'])
         return {"access_token": access_token, "user": dict(new_user)}
         
     except ValueError as e:
@@ -0,0 +1,67 @@
+"""
+Compare cache payload codecs on realistic job lists.
+
+Run from the repo root:  python -m backend.bench_cache_codec
+"""
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from backend.services import codecs
+
+WORDS = (
+    "react python developer engineer backend frontend team experience years "
+    "api design scalable cloud aws docker kubernetes sql postgres product "
+    "agile collaborate ownership testing ci cd microservices performance "
+    "bangalore mumbai hyderabad pune remote hybrid benefits salary growth"
+).split()
+
+def make_jobs(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    jobs = []
+    for i in range(n):
+        jobs.append({
+            "id": f"{rng.getrandbits(128):032x}",
+            "external_id": f"eyJqb2JfdGl0bGUiOi{rng.getrandbits(96):024x}",
+            "title": " ".join(rng.choices(WORDS, k=4)).title(),
+            "company": f"Company {i}",
+            "location": rng.choice(["Bengaluru, Karnataka", "Mumbai, Maharashtra", "Anywhere"]),
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(250, 600))),
+            "source": rng.choice(["LinkedIn", "Indeed", "Glassdoor", "Naukri.com"]),
+            "apply_url": f"https://example.com/jobs/{i}?utm_source=google_jobs_apply",
+            "salary_range": "",
+            "posted_at": (now - timedelta(hours=rng.randint(0, 23))).isoformat(),
+            "ai_score": rng.randint(20, 95),
+            "ai_reason": " ".join(rng.choices(WORDS, k=14)),
+        })
+    return jobs
+
+def bench(fn, repeat: int = 50) -> float:
+    """Best-of wall time in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+def main():
+    print(f"{'jobs':>5} {'codec':<14} {'bytes':>9} {'ratio':>6} {'encode us':>10} {'decode us':>10}")
+    for n in (30, 60, 100):
+        payload = {"stored_at": time.time(), "data": make_jobs(n)}
+        legacy = json.dumps(payload["data"], default=str)
+        baseline = len(legacy.encode("utf-8"))
+        enc_us = bench(lambda: json.dumps(payload["data"], default=str))
+        dec_us = bench(lambda: json.loads(legacy))
+        print(f"{n:>5} {'legacy-json':<14} {baseline:>9} {1.0:>6.2f} {enc_us:>10.0f} {dec_us:>10.0f}")
+
+        for name, codec in codecs.available_codecs().items():
+            blob = codecs.encode(payload, codec)
+            assert codecs.decode(blob) == payload
+            enc_us = bench(lambda: codecs.encode(payload, codec))
+            dec_us = bench(lambda: codecs.decode(blob))
+            print(f"{n:>5} {name:<14} {len(blob):>9} {baseline / len(blob):>6.2f} {enc_us:>10.0f} {dec_us:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 import os
+import time
+import asyncio
 import logging
 import asyncpg
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from fastapi import HTTPException
 from dotenv import load_dotenv
+from backend.services.metrics import registry, Counter, Gauge, Histogram
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
@@ -12,23 +17,109 @@ logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+# Seconds a request may wait for a free connection before it gets a 503
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "10"))
+# Connections are recycled after this many queries / this long idle (0 disables)
+DB_MAX_QUERIES = int(os.getenv("DB_MAX_QUERIES", "50000"))
+DB_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", "300"))
+# auto: decided from the DSN (see detect_pgbouncer); true / false force it
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "auto").lower()
+# Prepared statements kept per connection; empty means 0 behind PgBouncer, 256 otherwise
+DB_STATEMENT_CACHE_SIZE = os.getenv("DB_STATEMENT_CACHE_SIZE", "")
+# Per-session settings applied on connect, e.g. "application_name=jobtrackr,statement_timeout=30000"
+DB_SERVER_SETTINGS = os.getenv("DB_SERVER_SETTINGS", "application_name=jobtrackr")
+# SQL run on every new pooled connection, e.g. "SET search_path TO jobtrackr, public" (empty: none)
+DB_INIT_SQL = os.getenv("DB_INIT_SQL", "")
+
+# Supabase / Supavisor and most hosted poolers serve transaction mode on 6543
+PGBOUNCER_TRANSACTION_PORTS = {6543}
+
+pool_acquire_seconds = registry.register(Histogram(
+    "jobtrackr_db_pool_acquire_seconds", "Time spent waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+))
+pool_exhausted = registry.register(Counter(
+    "jobtrackr_db_pool_exhausted_total", "Acquires that found every connection busy at max pool size"
+))
+pool_acquire_timeouts = registry.register(Counter(
+    "jobtrackr_db_pool_acquire_timeouts_total", "Acquires that gave up after DB_ACQUIRE_TIMEOUT"
+))
+
+class PoolTimeoutError(Exception):
+    """No pooled connection became free within the acquire timeout."""
+
+def _parse_settings(text: str) -> Dict[str, str]:
+    settings = {}
+    for part in text.split(","):
+        key, sep, value = part.partition("=")
+        if sep and key.strip():
+            settings[key.strip()] = value.strip()
+    return settings
+
+def detect_pgbouncer(dsn: str) -> Tuple[bool, str]:
+    """
+    Whether the DSN points at a transaction-mode pooler, where prepared statements
+    cannot survive between transactions. Returns (detected, dsn without the
+    `pgbouncer` query flag, which asyncpg would otherwise send as a server setting).
+    """
+    parts = urlsplit(dsn)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    flag = next((v for k, v in query if k == "pgbouncer"), None)
+    clean_dsn = urlunsplit(parts._replace(query=urlencode([(k, v) for k, v in query if k != "pgbouncer"])))
+
+    if DB_PGBOUNCER in ("true", "false"):
+        return DB_PGBOUNCER == "true", clean_dsn
+    if flag is not None:
+        return flag.lower() in ("1", "true", "yes"), clean_dsn
+    host = (parts.hostname or "").lower()
+    detected = parts.port in PGBOUNCER_TRANSACTION_PORTS or "pgbouncer" in host
+    return detected, clean_dsn
+
 class Database:
     def __init__(self):
         self.pool: asyncpg.Pool = None
+        self.max_size = DB_POOL_MAX_SIZE
+        self.pgbouncer = False
+        self.statement_cache_size = 0
+        # Requests currently blocked in pool.acquire()
+        self.waiting = 0
+
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        """Runs DB_INIT_SQL once on every new pooled connection."""
+        await conn.execute(DB_INIT_SQL)
 
     async def connect(self):
         if not DATABASE_URL:
             logger.error("DATABASE_URL environment variable is not set")
             raise ValueError("DATABASE_URL environment variable is not set")
         
+        self.pgbouncer, dsn = detect_pgbouncer(DATABASE_URL)
+        if DB_STATEMENT_CACHE_SIZE:
+            self.statement_cache_size = int(DB_STATEMENT_CACHE_SIZE)
+        else:
+            # Direct connections keep asyncpg's statement cache, so the hot tracker
+            # queries are parsed and planned once per connection instead of per call
+            self.statement_cache_size = 0 if self.pgbouncer else 256
+        if self.pgbouncer and self.statement_cache_size:
+            logger.warning("Statement cache enabled behind PgBouncer transaction mode, expect prepared statement errors")
+        if self.pgbouncer and DB_INIT_SQL:
+            logger.warning("DB_INIT_SQL behind PgBouncer transaction mode only affects whichever server connection runs it")
+
         try:
-            logger.info("Connecting to database...")
+            logger.info(f"Connecting to database (pgbouncer={self.pgbouncer}, statement_cache_size={self.statement_cache_size})...")
             self.pool = await asyncpg.create_pool(
-                dsn=DATABASE_URL,
-                min_size=2,
-                max_size=10,
-                command_timeout=60,
-                statement_cache_size=0
+                dsn=dsn,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                command_timeout=DB_COMMAND_TIMEOUT,
+                max_queries=DB_MAX_QUERIES,
+                max_inactive_connection_lifetime=DB_MAX_INACTIVE_LIFETIME,
+                statement_cache_size=self.statement_cache_size,
+                server_settings=_parse_settings(DB_SERVER_SETTINGS),
+                init=self._init_connection if DB_INIT_SQL else None
             )
             logger.info("Successfully connected to database pool.")
         except Exception as e:
@@ -41,6 +132,33 @@ class Database:
             await self.pool.close()
             logger.info("Database pool closed.")
 
+    async def acquire_connection(self, timeout: Optional[float] = DB_ACQUIRE_TIMEOUT) -> asyncpg.Connection:
+        """pool.acquire() with wait-time and exhaustion metrics. Raises PoolTimeoutError after `timeout`."""
+        if self.pool.get_idle_size() == 0 and self.pool.get_size() >= self.max_size:
+            pool_exhausted.inc()
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            return await self.pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            pool_acquire_timeouts.inc()
+            raise PoolTimeoutError(f"No database connection free after {timeout}s")
+        finally:
+            self.waiting -= 1
+            pool_acquire_seconds.observe(time.perf_counter() - start)
+
+    async def release(self, connection: asyncpg.Connection) -> None:
+        await self.pool.release(connection)
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = DB_ACQUIRE_TIMEOUT) -> AsyncGenerator[asyncpg.Connection, None]:
+        """acquire_connection() as a context manager that releases the connection."""
+        connection = await self.acquire_connection(timeout)
+        try:
+            yield connection
+        finally:
+            await self.release(connection)
+
 db = Database()
 
 async def get_db() -> AsyncGenerator[asyncpg.Connection, None]:
@@ -48,19 +166,38 @@ async def get_db() -> AsyncGenerator[asyncpg.Connection, None]:
     if not db.pool:
         raise HTTPException(status_code=500, detail="Database pool is not initialized")
     
-    async with db.pool.acquire() as connection:
-        try:
-            yield connection
-        except Exception as e:
-            logger.error(f"Database error during request processing: {str(e)}")
-            raise
+    # Only a timeout while acquiring means the pool is busy; errors raised by the
+    # route while it holds the connection propagate unchanged
+    try:
+        connection = await db.acquire_connection()
+    except PoolTimeoutError:
+        raise HTTPException(status_code=503, detail="Database is busy, please retry")
+    try:
+        yield connection
+    except Exception as e:
+        logger.error(f"Database error during request processing: {str(e)}")
+        raise
+    finally:
+        await db.release(connection)
+
+def pool_stats() -> dict:
+    """Current pool size, idle and in-use connections, and requests waiting for one."""
+    if not db.pool:
+        return {"size": 0, "idle": 0, "in_use": 0, "waiting": db.waiting}
+    size, idle = db.pool.get_size(), db.pool.get_idle_size()
+    return {"size": size, "idle": idle, "in_use": size - idle, "waiting": db.waiting}
+
+registry.register(Gauge(
+    "jobtrackr_db_pool_connections", "asyncpg pool connections by state, plus requests waiting for one",
+    ("state",), fn=lambda: {(state,): value for state, value in pool_stats().items()}
+))
 
 async def test_connection() -> bool:
     """Health check function for the database"""
     if not db.pool:
         return False
     try:
-        async with db.pool.acquire() as connection:
+        async with db.acquire() as connection:
             await connection.execute("SELECT 1")
             return True
     except Exception as e:
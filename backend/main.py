@@ -1,17 +1,42 @@
 import os
+import hmac
+import json
 import time
+import random
+import logging
 from datetime import datetime
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.database import db, test_connection
+from backend.database import db, test_connection, pool_stats
+from backend.services.metrics import registry, http_request_duration
 from backend.services.cache import cache_service
-from backend.auth.router import router as auth_router
+from backend.services.ratelimit import gemini_limiter
+from backend.services.tracing import stage_stats
+from backend.services.replay import upstream_recorder
+from backend.services.http_client import http_client
+from backend.services.prewarm import prewarm_worker, search_popularity, PREWARM_ENABLED
+from backend.auth.router import router as auth_router, password_executor
 from backend.routes.jobs import router as jobs_router
 from dotenv import load_dotenv
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
+logger = logging.getLogger(__name__)
+
+# Fraction of ordinary requests written to the access log; errors and slow requests are always logged
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.05"))
+ACCESS_LOG_SLOW_SECONDS = float(os.getenv("ACCESS_LOG_SLOW_SECONDS", "1.0"))
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>" and is closed while no token is
+# set. METRICS_PUBLIC=true opens it without a token, for local development only.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() == "true"
+
+access_logger = logging.getLogger("backend.access")
+access_logger.setLevel(logging.INFO)
+if not access_logger.handlers:
+    access_logger.addHandler(logging.StreamHandler())
+    access_logger.propagate = False
 
 app = FastAPI(
     title="JobTrackr API",
@@ -38,18 +63,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request logging middleware
+# Request metrics and sampled access log
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    duration = time.time() - start_time
-    
-    # Simple console logger
-    status_code = response.status_code
-    print(f"[{request.method}] {request.url.path} - {status_code} - {duration:.3f}s")
-    
-    return response
+    start_time = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        duration = time.perf_counter() - start_time
+        # The route template keeps label cardinality bounded (no job ids in labels)
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        http_request_duration.observe(duration, request.method, route_path, str(status_code))
+
+        if status_code >= 500 or duration >= ACCESS_LOG_SLOW_SECONDS or random.random() < ACCESS_LOG_SAMPLE_RATE:
+            access_logger.info(json.dumps({
+                "ts": datetime.utcnow().isoformat(),
+                "method": request.method,
+                "route": route_path,
+                "path": request.url.path,
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 1)
+            }))
 
 # Global Exception Handler
 @app.exception_handler(Exception)
@@ -75,11 +113,31 @@ async def startup_event():
     redis_ok = await cache_service.is_healthy()
     print(f"Redis Status: {'Connected' if redis_ok else 'Failed'}")
 
+    print("Starting shared HTTP client...")
+    await http_client.connect()
+
+    if upstream_recorder.mode != "off":
+        print(f"Upstream {upstream_recorder.mode} mode, store: {upstream_recorder.directory}")
+
+    if METRICS_PUBLIC and not METRICS_TOKEN:
+        logger.warning("METRICS_PUBLIC is set: /metrics is served without authentication")
+
+    if PREWARM_ENABLED:
+        print("Starting search pre-warm worker...")
+        prewarm_worker.start()
+
 @app.on_event("shutdown")
 async def shutdown_event():
+    await prewarm_worker.stop()
+    await search_popularity.flush()
+
     print("Closing Database Pool...")
     await db.disconnect()
 
+    print("Closing shared HTTP client...")
+    await http_client.disconnect()
+    password_executor.shutdown(wait=False)
+
 @app.get("/health")
 async def health_check():
     db_ok = await test_connection()
@@ -89,9 +147,24 @@ async def health_check():
         "status": "up" if db_ok else "downgraded",
         "db": "connected" if db_ok else "error",
         "redis": "connected" if redis_ok else "error",
+        "db_pool": {**pool_stats(), "pgbouncer": db.pgbouncer, "statement_cache_size": db.statement_cache_size},
+        "gemini_limiter": gemini_limiter.stats(),
+        "upstream_replay": upstream_recorder.stats(),
+        "search_stages": stage_stats.summary(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text exposition of request, cache, pool and upstream metrics."""
+    if METRICS_TOKEN:
+        authorized = hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}")
+    else:
+        authorized = METRICS_PUBLIC
+    if not authorized:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/ping")
 async def ping():
     """Keep-alive strategy for Render.com free tier"""
@@ -0,0 +1,27 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+
+dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
+load_dotenv(dotenv_path)
+
+from backend.database import db
+from backend.services.http_client import http_client
+from backend.services.prewarm import prewarm_worker
+
+async def prewarm():
+    """One pre-warm cycle, for running from cron instead of inside the API process."""
+    print("Connecting to database to pre-warm popular searches...")
+    try:
+        await db.connect()
+        await http_client.connect()
+        warmed = await prewarm_worker.run_once()
+        print(f"Pre-warm complete, {warmed} searches refreshed.")
+    except Exception as e:
+        print(f"Error pre-warming searches: {e}")
+    finally:
+        await http_client.disconnect()
+        await db.disconnect()
+
+if __name__ == "__main__":
+    asyncio.run(prewarm())
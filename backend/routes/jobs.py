@@ -1,93 +1,248 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import json
+import uuid
+import base64
+import hashlib
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
+from fastapi.responses import StreamingResponse
 import asyncpg
 from typing import List, Optional
 from backend.database import get_db
 from backend.auth.jwt_handler import get_current_user
-from backend.services.scraper import fetch_jobs
 from backend.services.cache import cache_service
-from backend.services.gemini import rank_jobs, get_search_tips, optimize_search_queries
-from pydantic import BaseModel
+from backend.services.gemini import get_search_tips, DEFAULT_TIPS
+from backend.services.singleflight import search_flight
+from backend.services.search import run_search_pipeline, run_local_search, peek_cached_search, schedule_refresh, stream_search, SEARCH_LOCAL_MIN_RESULTS, SEARCH_PIPELINE_DEADLINE
+from backend.services.prewarm import search_popularity
+from backend.services.tracing import Trace, span, start_trace
+from pydantic import BaseModel, Field
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
 
 class StatusUpdate(BaseModel):
     status: str
 
+# Upper bound on ids per bulk request, so one call stays one reasonably sized statement
+BULK_MAX_ITEMS = 500
+VALID_STATUSES = ('applied', 'inprocess', 'rejected', 'hired')
+
+class BulkJobIds(BaseModel):
+    job_ids: List[str] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BulkStatusItem(BaseModel):
+    job_id: str
+    status: str
+
+class BulkStatusUpdate(BaseModel):
+    updates: List[BulkStatusItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+def _with_trace(result: dict, trace: Optional[Trace], response: Response, debug: bool) -> dict:
+    """Attach Server-Timing (and the span list when debug=true) to a traced search response."""
+    if trace is None:
+        return result
+    response.headers["Server-Timing"] = trace.server_timing()
+    if debug:
+        # Results may be shared with other single-flight callers, so never mutate them
+        result = {**result, "debug": trace.as_dict()}
+    return result
+
 @router.get("/search")
 async def search_jobs(
     role: str,
     experience: int,
-    db: asyncpg.Connection = Depends(get_db),
+    response: Response,
+    mode: str = Query("auto", pattern="^(auto|local|remote)$"),
+    debug: bool = Query(False),
     current_user: dict = Depends(get_current_user)
 ):
-    # 1. Check Cache
-    cached_jobs = await cache_service.get_cached_jobs(role, experience)
-    cached_tips = await cache_service.get_cached_tips(role, experience)
+    trace = start_trace(force=debug)
+
+    # Popularity feeds the background pre-warm worker
+    search_popularity.record(role, experience)
+
+    # 1. Check Cache (local LRU, then jobs + tips in one Redis round trip)
+    with span("cache"):
+        cached = await cache_service.get_cached_search(role, experience)
     
-    if cached_jobs is not None:
+    if cached is not None:
+        # Past the soft TTL: answer with the stale copy and refresh behind the scenes
+        if cached["stale"]:
+            schedule_refresh(role, experience)
+        cached_tips = cached["tips"]
         if cached_tips is None:
             cached_tips = await get_search_tips(role, experience)
-        return {
-            "jobs": cached_jobs,
+        return _with_trace({
+            "jobs": cached["jobs"],
             "ai_tips": cached_tips,
             "from_cache": True,
-            "total": len(cached_jobs)
-        }
-        
-    # 2. Optimize Queries
-    queries = await optimize_search_queries(role, experience)
-    
-    # 3. Fetch from SerpAPI
-    new_jobs = await fetch_jobs(role, experience, queries=queries)
-    if not new_jobs:
-        return {"jobs": [], "ai_tips": [], "from_cache": False, "total": 0}
-        
-    # 4. Save to DB (Upsert)
-    # Build batch upsert data
-    db_jobs = []
-    for job in new_jobs:
-        # Avoid duplicate external_ids in the same batch
-        row = await db.fetchrow(
-            """
-            INSERT INTO jobs (external_id, title, company, location, description, source, apply_url, salary_range, posted_at, experience_min)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            ON CONFLICT (external_id) DO UPDATE SET
-                title = EXCLUDED.title,
-                description = EXCLUDED.description,
-                apply_url = EXCLUDED.apply_url,
-                source = EXCLUDED.source,
-                fetched_at = now()
-            RETURNING id, external_id, title, company, location, description, source, apply_url, salary_range, posted_at
-            """,
-            job["external_id"], job["title"], job["company"], job.get("location"), job.get("description"),
-            job.get("source"), job.get("apply_url"), job.get("salary_range"), job.get("posted_at"), experience
+            "total": len(cached["jobs"])
+        }, trace, response, debug)
+
+    # 2. Local full-text search over the jobs table; auto falls back to SerpAPI on low recall
+    if mode != "remote":
+        with span("local_search"):
+            local = await run_local_search(role, experience, min_results=0 if mode == "local" else SEARCH_LOCAL_MIN_RESULTS)
+        if local is not None:
+            return _with_trace(local, trace, response, debug)
+        if mode == "local":
+            return _with_trace({"jobs": [], "ai_tips": DEFAULT_TIPS, "from_cache": False, "source": "local", "total": 0}, trace, response, debug)
+
+    # Cache miss: concurrent searches for the same key share one pipeline run.
+    # Stage spans are only recorded by the request whose trace started the run.
+    with span("pipeline"):
+        result = await search_flight.do(
+            cache_service.search_key(role, experience),
+            lambda: run_search_pipeline(role, experience),
+            peek=lambda: peek_cached_search(role, experience),
+            wait_timeout=SEARCH_PIPELINE_DEADLINE
         )
-        if row:
-            job_dict = dict(row)
-            job_dict["id"] = str(job_dict["id"])
-            db_jobs.append(job_dict)
+    return _with_trace(result, trace, response, debug)
 
-    print(f"DEBUG API jobs passed to rank_jobs: {db_jobs}")
+@router.get("/search/stream")
+async def search_jobs_stream(
+    role: str,
+    experience: int,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    mode: str = Query("auto", pattern="^(auto|local|remote)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streaming variant of /search: raw jobs are pushed as each SerpAPI query returns,
+    followed by a `scores` event once ranking finishes, then `tips` and `done`.
+    """
+    search_popularity.record(role, experience)
 
-    # 5. AI Rank Results
-    ranked_jobs = await rank_jobs(db_jobs, role, experience)
-    ai_tips = await get_search_tips(role, experience)
-    
-    # Format dates to string for caching compatibility
-    for j in ranked_jobs:
-        if j.get("posted_at"):
-            j["posted_at"] = j["posted_at"].isoformat()
-            
-    # 6. Cache Results
-    await cache_service.cache_jobs(role, experience, ranked_jobs)
-    await cache_service.cache_tips(role, experience, ai_tips)
-    
-    return {
-        "jobs": ranked_jobs,
-        "ai_tips": ai_tips,
-        "from_cache": False,
-        "total": len(ranked_jobs)
-    }
+    async def events():
+        stream = stream_search(role, experience, mode=mode)
+        try:
+            async for event in stream:
+                payload = json.dumps(event, default=str)
+                if format == "sse":
+                    yield f"event: {event['event']}\ndata: {payload}\n\n"
+                else:
+                    yield payload + "\n"
+        finally:
+            # On client disconnect stop our consumer now rather than whenever the generator is collected
+            await stream.aclose()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+# Bulk tracker endpoints: each runs one set-based statement over unnest()ed ids and
+# reports an outcome per requested id. Declared before the /{job_id} routes so
+# "bulk" is not taken for a job id.
+
+BULK_APPLY_SQL = """
+WITH input AS (
+    SELECT DISTINCT unnest($2::uuid[]) AS job_id
+),
+inserted AS (
+    INSERT INTO applied_jobs (user_id, job_id, status)
+    SELECT $1, i.job_id, 'applied'
+    FROM input i JOIN jobs j ON j.id = i.job_id
+    ON CONFLICT (user_id, job_id) DO NOTHING
+    RETURNING job_id
+)
+SELECT
+    i.job_id,
+    EXISTS (SELECT 1 FROM jobs j WHERE j.id = i.job_id) AS job_exists,
+    EXISTS (SELECT 1 FROM inserted n WHERE n.job_id = i.job_id) AS inserted
+FROM input i
+"""
+
+BULK_SAVE_SQL = """
+WITH input AS (
+    SELECT DISTINCT unnest($2::uuid[]) AS job_id
+),
+inserted AS (
+    INSERT INTO saved_jobs (user_id, job_id)
+    SELECT $1, i.job_id
+    FROM input i JOIN jobs j ON j.id = i.job_id
+    ON CONFLICT (user_id, job_id) DO NOTHING
+    RETURNING job_id
+)
+SELECT
+    i.job_id,
+    EXISTS (SELECT 1 FROM jobs j WHERE j.id = i.job_id) AS job_exists,
+    EXISTS (SELECT 1 FROM inserted n WHERE n.job_id = i.job_id) AS inserted
+FROM input i
+"""
+
+BULK_STATUS_SQL = """
+UPDATE applied_jobs aj
+SET status = u.status, updated_at = now()
+FROM unnest($2::uuid[], $3::text[]) AS u(job_id, status)
+WHERE aj.user_id = $1 AND aj.job_id = u.job_id
+RETURNING aj.job_id
+"""
+
+def _split_job_ids(job_ids: List[str]) -> tuple:
+    """Separate parseable UUIDs from the rest, keeping the caller's spelling for the response."""
+    valid, results = {}, {}
+    for raw in job_ids:
+        try:
+            valid[raw] = uuid.UUID(raw)
+        except ValueError:
+            results[raw] = "invalid_id"
+    return valid, results
+
+async def _bulk_insert(db: asyncpg.Connection, sql: str, user_id, job_ids: List[str], done: str, existing: str) -> dict:
+    valid, results = _split_job_ids(job_ids)
+    if valid:
+        rows = await db.fetch(sql, user_id, list(set(valid.values())))
+        outcome = {
+            r["job_id"]: done if r["inserted"] else (existing if r["job_exists"] else "not_found")
+            for r in rows
+        }
+        for raw, job_id in valid.items():
+            results[raw] = outcome[job_id]
+    return {"results": [{"job_id": raw, "result": results[raw]} for raw in dict.fromkeys(job_ids)]}
+
+@router.post("/apply/bulk")
+async def bulk_apply_jobs(
+    body: BulkJobIds,
+    db: asyncpg.Connection = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Mark many jobs as applied. Per item: applied, already_applied, not_found or invalid_id."""
+    return await _bulk_insert(db, BULK_APPLY_SQL, current_user["id"], body.job_ids, "applied", "already_applied")
+
+@router.post("/save/bulk")
+async def bulk_save_jobs(
+    body: BulkJobIds,
+    db: asyncpg.Connection = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Save many jobs. Per item: saved, already_saved, not_found or invalid_id."""
+    return await _bulk_insert(db, BULK_SAVE_SQL, current_user["id"], body.job_ids, "saved", "already_saved")
+
+@router.patch("/apply/bulk/status")
+async def bulk_update_application_status(
+    body: BulkStatusUpdate,
+    db: asyncpg.Connection = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Move many applications at once. Per item: updated, not_found, invalid_status or invalid_id."""
+    valid, results = _split_job_ids([u.job_id for u in body.updates])
+    # Outcomes are per job, not per spelling: the last update for a job wins, and
+    # every spelling of that job's id (e.g. different case) reports the same result
+    last_status = {}
+    for u in body.updates:
+        if u.job_id in valid:
+            last_status[valid[u.job_id]] = u.status
+    outcome = {job_id: "invalid_status" for job_id, s in last_status.items() if s not in VALID_STATUSES}
+    updates = {job_id: s for job_id, s in last_status.items() if job_id not in outcome}
+
+    if updates:
+        job_ids = list(updates)
+        rows = await db.fetch(BULK_STATUS_SQL, current_user["id"], job_ids, [updates[j] for j in job_ids])
+        updated = {r["job_id"] for r in rows}
+        for job_id in job_ids:
+            outcome[job_id] = "updated" if job_id in updated else "not_found"
+    for raw, job_id in valid.items():
+        results[raw] = outcome[job_id]
+
+    return {"results": [{"job_id": raw, "result": results[raw]} for raw in dict.fromkeys(u.job_id for u in body.updates)]}
 
 @router.post("/apply/{job_id}", status_code=status.HTTP_201_CREATED)
 async def apply_job(
@@ -114,7 +269,7 @@ async def update_application_status(
     db: asyncpg.Connection = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    if update.status not in ['applied', 'inprocess', 'rejected', 'hired']:
+    if update.status not in VALID_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status")
         
     res = await db.execute(
@@ -169,72 +324,159 @@ async def unsave_job(
         current_user["id"], job_id
     )
 
+# One statement for the whole dashboard: the user's tracked jobs are gathered once,
+# the summary is counted over them with FILTER, and the requested page is cut with a
+# keyset cursor on (activity_at, id). The summary row is LEFT JOINed so it comes back
+# even when the page is empty.
+MY_JOBS_SQL = """
+WITH user_jobs AS (
+    SELECT
+        j.id, j.title, j.company, j.location, j.source, j.apply_url, j.salary_range,
+        aj.status, aj.applied_at, aj.updated_at,
+        sj.saved_at,
+        COALESCE(aj.updated_at, sj.saved_at) AS activity_at,
+        aj.id IS NOT NULL AS is_applied,
+        sj.id IS NOT NULL AS is_saved
+    FROM (
+        SELECT job_id FROM applied_jobs WHERE user_id = $1
+        UNION
+        SELECT job_id FROM saved_jobs WHERE user_id = $1
+    ) tracked
+    JOIN jobs j ON j.id = tracked.job_id
+    LEFT JOIN applied_jobs aj ON aj.job_id = j.id AND aj.user_id = $1
+    LEFT JOIN saved_jobs sj ON sj.job_id = j.id AND sj.user_id = $1
+),
+summary AS (
+    SELECT
+        COUNT(*) FILTER (WHERE status = 'applied') AS applied_count,
+        COUNT(*) FILTER (WHERE status = 'inprocess') AS inprocess_count,
+        COUNT(*) FILTER (WHERE status = 'rejected') AS rejected_count,
+        COUNT(*) FILTER (WHERE status = 'hired') AS hired_count,
+        COUNT(*) FILTER (WHERE is_saved AND NOT is_applied) AS saved_count
+    FROM user_jobs
+),
+page AS (
+    SELECT * FROM user_jobs
+    WHERE (
+        $2 = 'all'
+        OR ($2 = 'saved' AND is_saved AND NOT is_applied)
+        OR ($2 = 'applied' AND is_applied)
+        OR status = $2
+    )
+    AND ($3::timestamptz IS NULL OR (activity_at, id) < ($3::timestamptz, $4::uuid))
+    ORDER BY activity_at DESC, id DESC
+    LIMIT $5
+)
+SELECT page.*, summary.*
+FROM summary LEFT JOIN page ON true
+ORDER BY page.activity_at DESC, page.id DESC
+"""
+
+MY_JOBS_FILTERS = ('all', 'saved', 'applied', 'inprocess', 'rejected', 'hired')
+MY_JOBS_COLUMNS = ('id', 'title', 'company', 'location', 'source', 'apply_url', 'salary_range', 'status', 'applied_at', 'updated_at', 'saved_at')
+
+def _encode_cursor(activity_at: datetime, job_id) -> str:
+    raw = f"{activity_at.isoformat()}|{job_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        activity_at, job_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(activity_at), uuid.UUID(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/my-jobs")
 async def my_jobs(
     filter: str = Query("all"),
+    limit: int = Query(50, ge=0, le=200),
+    cursor: Optional[str] = None,
     db: asyncpg.Connection = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    # Base joins
-    query = """
-    SELECT 
-        j.id, j.title, j.company, j.location, j.source, j.apply_url, j.salary_range,
-        aj.status, aj.applied_at, aj.updated_at,
-        sj.saved_at
-    FROM jobs j
-    LEFT JOIN applied_jobs aj ON j.id = aj.job_id AND aj.user_id = $1
-    LEFT JOIN saved_jobs sj ON j.id = sj.job_id AND sj.user_id = $1
-    WHERE (aj.id IS NOT NULL OR sj.id IS NOT NULL)
-    """
-    
-    if filter == 'saved':
-        query += " AND sj.id IS NOT NULL AND aj.id IS NULL"
-    elif filter == 'applied':
-        query += " AND aj.id IS NOT NULL"
-    elif filter in ['inprocess', 'rejected', 'hired']:
-        query += f" AND aj.status = '{filter}'"
-
-    query += " ORDER BY COALESCE(aj.updated_at, sj.saved_at) DESC"
-    
-    rows = await db.fetch(query, current_user["id"])
-    
-    # Calculate summary counts
-    summary = {"applied": 0, "inprocess": 0, "rejected": 0, "hired": 0, "saved": 0}
-    all_jobs_user = await db.fetch("""
-        SELECT status, COUNT(*) as c FROM applied_jobs WHERE user_id = $1 GROUP BY status
-    """, current_user["id"])
-    for r in all_jobs_user:
-        if r['status'] in summary:
-            summary[r['status']] = r['c']
-            
-    saved_count = await db.fetchval("SELECT COUNT(*) FROM saved_jobs WHERE user_id = $1 AND job_id NOT IN (SELECT job_id FROM applied_jobs WHERE user_id = $1)", current_user["id"])
-    summary["saved"] = saved_count or 0
+    """Tracked jobs, newest activity first, paged with `next_cursor`. limit=0 returns only the summary."""
+    if filter not in MY_JOBS_FILTERS:
+        filter = 'all'
+    cursor_at, cursor_id = _decode_cursor(cursor) if cursor else (None, None)
+
+    rows = await db.fetch(MY_JOBS_SQL, current_user["id"], filter, cursor_at, cursor_id, limit)
+
+    first = rows[0]
+    summary = {
+        "applied": first["applied_count"],
+        "inprocess": first["inprocess_count"],
+        "rejected": first["rejected_count"],
+        "hired": first["hired_count"],
+        "saved": first["saved_count"]
+    }
+    jobs = [{c: r[c] for c in MY_JOBS_COLUMNS} for r in rows if r["id"] is not None]
+
+    next_cursor = None
+    if limit and len(jobs) == limit:
+        last = rows[len(jobs) - 1]
+        next_cursor = _encode_cursor(last["activity_at"], last["id"])
     
     return {
-        "jobs": [dict(r) for r in rows],
-        "summary": summary
+        "jobs": jobs,
+        "summary": summary,
+        "next_cursor": next_cursor
     }
 
+JOB_DETAIL_SQL = """
+SELECT
+    j.id, j.external_id, j.title, j.company, j.location, j.experience_min, j.experience_max,
+    j.description, j.source, j.apply_url, j.salary_range, j.skills, j.posted_at, j.fetched_at,
+    j.alternate_apply_urls,
+    aj.status, aj.applied_at, aj.updated_at AS applied_updated_at,
+    sj.saved_at
+FROM jobs j
+LEFT JOIN applied_jobs aj ON aj.job_id = j.id AND aj.user_id = $2
+LEFT JOIN saved_jobs sj ON sj.job_id = j.id AND sj.user_id = $2
+WHERE j.id = $1
+"""
+
+def _job_etag(row, user_id) -> str:
+    # fetched_at moves on every re-ingest; the tracker timestamps move on apply,
+    # status change and save. Anything else in the response derives from these.
+    parts = [row["id"], user_id, row["fetched_at"], row["applied_at"], row["applied_updated_at"], row["saved_at"]]
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
 @router.get("/{job_id}")
 async def get_job_details(
     job_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: asyncpg.Connection = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    job = await db.fetchrow("SELECT * FROM jobs WHERE id = $1", job_id)
-    if not job:
+    row = await db.fetchrow(JOB_DETAIL_SQL, job_id, current_user["id"])
+    if not row:
         raise HTTPException(status_code=404, detail="Job not found")
-        
-    applied = await db.fetchrow("SELECT status, applied_at FROM applied_jobs WHERE user_id = $1 AND job_id = $2", current_user["id"], job_id)
-    saved = await db.fetchrow("SELECT saved_at FROM saved_jobs WHERE user_id = $1 AND job_id = $2", current_user["id"], job_id)
-    
-    res = dict(job)
+
+    etag = _job_etag(row, current_user["id"])
+    # private: the body carries per-user tracker state; no-cache: always revalidate
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    res = {k: row[k] for k in row.keys() if k not in ("status", "applied_at", "applied_updated_at", "saved_at")}
+    res["alternate_apply_urls"] = json.loads(row["alternate_apply_urls"]) if row["alternate_apply_urls"] else []
     res["user_data"] = {
-        "applied": bool(applied),
-        "status": applied["status"] if applied else None,
-        "applied_at": applied["applied_at"] if applied else None,
-        "saved": bool(saved),
-        "saved_at": saved["saved_at"] if saved else None
+        "applied": row["applied_at"] is not None,
+        "status": row["status"],
+        "applied_at": row["applied_at"],
+        "saved": row["saved_at"] is not None,
+        "saved_at": row["saved_at"]
     }
     
     return res
@@ -1,9 +1,12 @@
 import os
-import json
+import time
 import logging
-from typing import List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 import redis.asyncio as redis
 from dotenv import load_dotenv
+from backend.services import codecs
+from backend.services.metrics import cache_requests
 
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path)
@@ -11,56 +14,293 @@ logger = logging.getLogger(__name__)
 
 UPSTASH_REDIS_URL = os.getenv("UPSTASH_REDIS_URL")
 
+# Entries older than the soft TTL are served stale and refreshed in the background,
+# entries older than the hard TTL are gone. Defaults keep the old 6 hour freshness.
+CACHE_SOFT_TTL = int(os.getenv("CACHE_SOFT_TTL", "21600"))
+CACHE_HARD_TTL = int(os.getenv("CACHE_HARD_TTL", "43200"))
+
+# In-process tier, bounded by encoded payload size and entry count
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "256"))
+# How long a worker trusts its local copy before rechecking Redis, so refreshes and
+# invalidations from other workers are picked up. Never longer than the soft TTL.
+LOCAL_CACHE_TTL = min(int(os.getenv("LOCAL_CACHE_TTL", "300")), CACHE_SOFT_TTL)
+
+# After a stale hit starts a background refresh, further stale hits on the same search
+# leave it alone for this long, whether or not the refresh managed to store anything
+REFRESH_COOLDOWN = int(os.getenv("REFRESH_COOLDOWN", "900"))
+
+# Per-job AI scores outlive the search cache: a listing keeps its score for a few days
+SCORE_CACHE_TTL = int(os.getenv("SCORE_CACHE_TTL", "259200"))
+
+# Payload codec for Redis values: auto | msgpack-zstd | json-zlib | json
+CACHE_CODEC = os.getenv("CACHE_CODEC", "auto")
+
+def normalize_role(role: str) -> str:
+    """Case- and whitespace-insensitive form of a role; everything keyed by role goes through it."""
+    return " ".join(role.lower().split())
+
+class LocalLRU:
+    """
+    Small in-process LRU that evicts by total payload size and entry count. Values are
+    kept encoded: the byte budget is real memory, and every read decodes a private
+    copy that callers may mutate freely.
+    """
+
+    def __init__(self, max_bytes: int = LOCAL_CACHE_MAX_BYTES, max_entries: int = LOCAL_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # key -> (encoded payload, stored_at, loaded_at)
+        self._data: "OrderedDict[str, Tuple[bytes, float, float]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float, float]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, raw: bytes, stored_at: float) -> None:
+        if len(raw) > self.max_bytes:
+            return
+        self.delete(key)
+        self._data[key] = (raw, stored_at, time.time())
+        self._bytes += len(raw)
+        while self._data and (self._bytes > self.max_bytes or len(self._data) > self.max_entries):
+            _, (evicted, _, _) = self._data.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def delete(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
 class CacheService:
-    def __init__(self):
+    def __init__(self, codec: Optional[codecs.Codec] = None):
         self.redis = None
+        self.local = LocalLRU()
+        # refresh marker key -> expiry, only used when there is no Redis
+        self._refresh_claims: Dict[str, float] = {}
+        self.codec = codec or codecs.get_codec(CACHE_CODEC)
         if UPSTASH_REDIS_URL:
             try:
-                self.redis = redis.from_url(UPSTASH_REDIS_URL, decode_responses=True)
+                # Values are binary codec payloads, so responses stay as bytes
+                self.redis = redis.from_url(UPSTASH_REDIS_URL, decode_responses=False)
             except Exception as e:
                 logger.error(f"Failed to initialize Redis: {str(e)}")
 
     def _get_key(self, prefix: str, role: str, experience: int) -> str:
-        role_fmt = role.lower().replace(" ", "_").strip()
+        role_fmt = normalize_role(role).replace(" ", "_")
         return f"{prefix}:{role_fmt}:{experience}"
 
-    async def get_cached_jobs(self, role: str, experience: int) -> Optional[List[dict]]:
-        return None
+    def search_key(self, role: str, experience: int) -> str:
+        """Normalized key identifying one (role, experience) search."""
+        return self._get_key("search", role, experience)
+
+    def score_key(self, role: str, experience: int, resume_hash: str, job_key: str) -> str:
+        """Key for one job's AI score under a given (role, experience, resume)."""
+        return f"{self._get_key('score', role, experience)}:{resume_hash}:{job_key}"
+
+    def _encode(self, data: Any, stored_at: float) -> bytes:
+        return codecs.encode({"stored_at": stored_at, "data": data}, self.codec)
+
+    def _decode(self, raw: bytes) -> Tuple[Any, float]:
+        obj = codecs.decode(raw)
+        if isinstance(obj, dict) and "data" in obj and "stored_at" in obj:
+            return obj["data"], obj["stored_at"]
+        # Entries written before the envelope existed carry no timestamp, treat them as fresh
+        return obj, time.time()
+
+    async def _read(self, keys: List[str]) -> List[Optional[Tuple[Any, float]]]:
+        """Look keys up in the local tier, then fetch all misses from Redis in one pipeline."""
+        now = time.time()
+        results: List[Optional[Tuple[Any, float]]] = []
+        missing = []
+        for key in keys:
+            hit = None
+            entry = self.local.get(key)
+            if entry is not None:
+                raw, stored_at, loaded_at = entry
+                # With Redis behind it, a local copy is only trusted for LOCAL_CACHE_TTL and
+                # until it turns stale; past that Redis may hold a newer entry
+                expired = now - stored_at >= CACHE_HARD_TTL or (
+                    self.redis is not None and (now - loaded_at >= LOCAL_CACHE_TTL or now - stored_at >= CACHE_SOFT_TTL)
+                )
+                if expired:
+                    self.local.delete(key)
+                else:
+                    hit = self._decode(raw)
+            if hit is None:
+                missing.append(len(results))
+            results.append(hit)
+        cache_requests.inc("local", "hit", amount=len(keys) - len(missing))
+        cache_requests.inc("local", "miss", amount=len(missing))
+
+        if not missing or not self.redis:
+            return results
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for i in missing:
+                pipe.get(keys[i])
+            raws = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis get error: {str(e)}")
+            cache_requests.inc("redis", "error", amount=len(missing))
+            return results
+
+        redis_hits = sum(1 for raw in raws if raw)
+        cache_requests.inc("redis", "hit", amount=redis_hits)
+        cache_requests.inc("redis", "miss", amount=len(missing) - redis_hits)
+        for i, raw in zip(missing, raws):
+            if not raw:
+                continue
+            try:
+                data, stored_at = self._decode(raw)
+            except Exception as e:
+                logger.error(f"Redis decode error for {keys[i]}: {str(e)}")
+                continue
+            self.local.set(keys[i], raw, stored_at)
+            results[i] = (data, stored_at)
+        return results
+
+    async def _write(self, items: List[Tuple[str, Any]]) -> None:
+        """Write entries to both tiers; Redis writes go out in one pipeline."""
+        stored_at = time.time()
+        encoded = [(key, self._encode(data, stored_at)) for key, data in items]
+        for key, raw in encoded:
+            self.local.set(key, raw, stored_at)
 
-    async def cache_jobs(self, role: str, experience: int, jobs: List[dict]) -> None:
         if not self.redis: return
         try:
-            key = self._get_key("jobs", role, experience)
-            # 6 hours = 21600 seconds
-            await self.redis.setex(key, 21600, json.dumps(jobs, default=str)) # default=str for datetime
+            pipe = self.redis.pipeline(transaction=False)
+            for key, raw in encoded:
+                pipe.setex(key, CACHE_HARD_TTL, raw)
+            await pipe.execute()
         except Exception as e:
-            logger.error(f"Redis cache jobs error: {str(e)}")
+            logger.error(f"Redis cache write error: {str(e)}")
+
+    async def get_cached_search(self, role: str, experience: int) -> Optional[dict]:
+        """
+        Fetch jobs and tips together. Returns None on a jobs miss, otherwise
+        {"jobs", "tips", "stale"} where `stale` means the soft TTL has passed.
+        """
+        jobs_key = self._get_key("jobs", role, experience)
+        tips_key = self._get_key("tips", role, experience)
+        jobs_hit, tips_hit = await self._read([jobs_key, tips_key])
+        if jobs_hit is None:
+            return None
+
+        jobs, stored_at = jobs_hit
+        return {
+            "jobs": jobs,
+            "tips": tips_hit[0] if tips_hit else None,
+            "stale": time.time() - stored_at >= CACHE_SOFT_TTL
+        }
+
+    async def get_cached_jobs(self, role: str, experience: int) -> Optional[List[dict]]:
+        hit = (await self._read([self._get_key("jobs", role, experience)]))[0]
+        return hit[0] if hit else None
+
+    async def cache_jobs(self, role: str, experience: int, jobs: List[dict]) -> None:
+        await self._write([(self._get_key("jobs", role, experience), jobs)])
 
     async def get_cached_tips(self, role: str, experience: int) -> Optional[List[dict]]:
+        hit = (await self._read([self._get_key("tips", role, experience)]))[0]
+        return hit[0] if hit else None
+
+    async def cache_tips(self, role: str, experience: int, tips: List[dict]) -> None:
+        await self._write([(self._get_key("tips", role, experience), tips)])
+
+    async def cache_search(self, role: str, experience: int, jobs: List[dict], tips: List[dict]) -> None:
+        await self._write([
+            (self._get_key("jobs", role, experience), jobs),
+            (self._get_key("tips", role, experience), tips)
+        ])
+
+    async def get_job_scores(self, keys: List[str]) -> Dict[str, dict]:
+        """
+        Fetch cached per-job scores in one round trip. Scores skip the local tier
+        so they cannot crowd search results out of the LRU.
+        """
+        if not self.redis or not keys: return {}
+        try:
+            raws = await self.redis.mget(keys)
+        except Exception as e:
+            logger.error(f"Redis get scores error: {str(e)}")
+            cache_requests.inc("scores", "error", amount=len(keys))
+            return {}
+
+        score_hits = sum(1 for raw in raws if raw)
+        cache_requests.inc("scores", "hit", amount=score_hits)
+        cache_requests.inc("scores", "miss", amount=len(keys) - score_hits)
+
+        scores = {}
+        for key, raw in zip(keys, raws):
+            if not raw:
+                continue
+            try:
+                scores[key] = codecs.decode(raw)
+            except Exception as e:
+                logger.error(f"Redis decode error for {key}: {str(e)}")
+        return scores
+
+    async def cache_job_scores(self, scores: Dict[str, dict]) -> None:
+        if not self.redis or not scores: return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, score in scores.items():
+                pipe.setex(key, SCORE_CACHE_TTL, codecs.encode(score, self.codec))
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis cache scores error: {str(e)}")
+
+    async def get_value(self, key: str) -> Optional[Any]:
+        """Plain Redis read through the codec, for callers that manage their own keys and TTLs."""
         if not self.redis: return None
         try:
-            key = self._get_key("tips", role, experience)
-            data = await self.redis.get(key)
-            if data:
-                return json.loads(data)
-            return None
+            raw = await self.redis.get(key)
+            return codecs.decode(raw) if raw else None
         except Exception as e:
-            logger.error(f"Redis get tips error: {str(e)}")
+            logger.error(f"Redis get error for {key}: {str(e)}")
             return None
 
-    async def cache_tips(self, role: str, experience: int, tips: List[dict]) -> None:
+    async def set_value(self, key: str, value: Any, ttl: int) -> None:
         if not self.redis: return
         try:
-            key = self._get_key("tips", role, experience)
-            await self.redis.setex(key, 21600, json.dumps(tips))
+            await self.redis.setex(key, ttl, codecs.encode(value, self.codec))
         except Exception as e:
-            logger.error(f"Redis cache tips error: {str(e)}")
+            logger.error(f"Redis set error for {key}: {str(e)}")
+
+    async def claim_refresh(self, role: str, experience: int) -> bool:
+        """
+        Take the refresh marker for a search (SET NX EX in Redis) so only one background
+        refresh starts per REFRESH_COOLDOWN. The marker is never released early: a refresh
+        that failed or found nothing leaves stored_at as is, and retrying it on every
+        stale hit would only burn upstream quota.
+        """
+        key = self._get_key("refreshing", role, experience)
+        if self.redis:
+            try:
+                return bool(await self.redis.set(key, b"1", nx=True, ex=REFRESH_COOLDOWN))
+            except Exception as e:
+                logger.error(f"Redis refresh marker error for {key}: {str(e)}")
+
+        now = time.time()
+        self._refresh_claims = {k: exp for k, exp in self._refresh_claims.items() if exp > now}
+        if key in self._refresh_claims:
+            return False
+        self._refresh_claims[key] = now + REFRESH_COOLDOWN
+        return True
 
     async def clear_cache(self, role: str, experience: int) -> None:
+        jobs_key = self._get_key("jobs", role, experience)
+        tips_key = self._get_key("tips", role, experience)
+        self.local.delete(jobs_key)
+        self.local.delete(tips_key)
         if not self.redis: return
         try:
-            jobs_key = self._get_key("jobs", role, experience)
-            tips_key = self._get_key("tips", role, experience)
             await self.redis.delete(jobs_key, tips_key)
         except Exception as e:
             logger.error(f"Redis clear cache error: {str(e)}")
@@ -0,0 +1,106 @@
+import json
+import zlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# msgpack and zstandard are optional; without them we fall back to zlib-compressed JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Every encoded payload starts with MAGIC + format version + codec id. Payloads without
+# the header are legacy plain JSON strings written before codecs existed.
+MAGIC = b"JT"
+FORMAT_VERSION = 1
+
+class Codec(ABC):
+    """Turns a JSON-like object into bytes and back."""
+    id: int = 0
+    name: str = ""
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        ...
+
+class JsonCodec(Codec):
+    id = 1
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=str, separators=(",", ":")).encode("utf-8") # default=str for datetime
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+class JsonZlibCodec(JsonCodec):
+    id = 2
+    name = "json-zlib"
+
+    def dumps(self, obj: Any) -> bytes:
+        return zlib.compress(super().dumps(obj), 6)
+
+    def loads(self, data: bytes) -> Any:
+        return super().loads(zlib.decompress(data))
+
+class MsgpackZstdCodec(Codec):
+    id = 3
+    name = "msgpack-zstd"
+
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._compressor.compress(msgpack.packb(obj, default=str, use_bin_type=True))
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(self._decompressor.decompress(data), raw=False)
+
+def available_codecs() -> Dict[str, Codec]:
+    codecs: Dict[str, Codec] = {"json": JsonCodec(), "json-zlib": JsonZlibCodec()}
+    if msgpack is not None and zstandard is not None:
+        codecs["msgpack-zstd"] = MsgpackZstdCodec()
+    return codecs
+
+_CODECS = available_codecs()
+_CODECS_BY_ID = {c.id: c for c in _CODECS.values()}
+
+def get_codec(name: str = "auto") -> Codec:
+    """Resolve a codec by name; 'auto' picks the most compact one installed."""
+    if name == "auto":
+        return _CODECS.get("msgpack-zstd") or _CODECS["json-zlib"]
+    if name not in _CODECS:
+        logger.warning(f"Cache codec '{name}' is not available, falling back to json-zlib")
+        return _CODECS["json-zlib"]
+    return _CODECS[name]
+
+def encode(obj: Any, codec: Codec) -> bytes:
+    return MAGIC + bytes([FORMAT_VERSION, codec.id]) + codec.dumps(obj)
+
+def decode(data: bytes) -> Any:
+    """Decode a payload written by any codec, including legacy headerless JSON."""
+    if isinstance(data, str):
+        return json.loads(data)
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+
+    version, codec_id = data[2], data[3]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache payload version {version}")
+    codec = _CODECS_BY_ID.get(codec_id)
+    if codec is None:
+        raise ValueError(f"Cache payload written with unavailable codec id {codec_id}")
+    return codec.loads(data[4:])
@@ -0,0 +1,125 @@
+import os
+import re
+import zlib
+import logging
+from typing import Dict, List
+import numpy as np
+from dotenv import load_dotenv
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path)
+logger = logging.getLogger(__name__)
+
+# Estimated Jaccard similarity above which two listings are the same posting
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+# Title word overlap two listings also need, so one company's openings that share
+# a long boilerplate description are not collapsed into each other
+DEDUP_TITLE_THRESHOLD = float(os.getenv("DEDUP_TITLE_THRESHOLD", "0.5"))
+
+# 64 MinHash permutations split into 16 LSH bands of 4 rows: pairs around
+# 0.5 Jaccard or above almost always share a band and get verified
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+
+# Universal hashing modulo the Mersenne prime 2**31 - 1. Shingle hashes, a and b all
+# stay below 2**31, so a * h + b < 2**63 and never wraps in uint64.
+_PRIME = np.uint64(2**31 - 1)
+_rng = np.random.RandomState(1234)
+_PERM_A = _rng.randint(1, 2**31 - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 2**31 - 1, size=NUM_PERM, dtype=np.uint64)
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+def _normalize(text: str) -> List[str]:
+    return _NON_WORD_RE.sub(" ", (text or "").lower()).split()
+
+def _shingles(job: dict) -> np.ndarray:
+    """Hashed word 3-grams over normalized title, company and description."""
+    words = _normalize(f"{job.get('title')} {job.get('company')} {(job.get('description') or '')[:3000]}")
+    if len(words) < SHINGLE_SIZE:
+        grams = words
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.unique(np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64) % _PRIME)
+
+def minhash_signature(job: dict) -> np.ndarray:
+    hashes = _shingles(job)
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    # (a * h + b) mod p for every permutation x shingle, min over shingles
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME
+    return permuted.min(axis=1)
+
+def _title_similarity(a: dict, b: dict) -> float:
+    words_a, words_b = set(_normalize(a.get("title"))), set(_normalize(b.get("title")))
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def find_duplicate_clusters(jobs: List[dict], threshold: float = DEDUP_THRESHOLD,
+                            title_threshold: float = DEDUP_TITLE_THRESHOLD) -> List[List[int]]:
+    """Group job indexes whose estimated Jaccard similarity reaches `threshold` and whose titles agree."""
+    n = len(jobs)
+    if n < 2:
+        return [[i] for i in range(n)]
+
+    signatures = np.stack([minhash_signature(j) for j in jobs])
+    parent = list(range(n))
+
+    # LSH: only jobs that collide in at least one band are compared
+    buckets: Dict[tuple, List[int]] = {}
+    for b in range(LSH_BANDS):
+        band = signatures[:, b * LSH_ROWS:(b + 1) * LSH_ROWS]
+        for i in range(n):
+            buckets.setdefault((b, band[i].tobytes()), []).append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                i, j = members[x], members[y]
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if (float(np.mean(signatures[i] == signatures[j])) >= threshold
+                        and _title_similarity(jobs[i], jobs[j]) >= title_threshold):
+                    parent[_find(parent, j)] = _find(parent, i)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(n):
+        clusters.setdefault(_find(parent, i), []).append(i)
+    return sorted(clusters.values(), key=lambda c: c[0])
+
+def collapse_near_duplicates(jobs: List[dict], threshold: float = DEDUP_THRESHOLD) -> List[dict]:
+    """
+    Collapse syndicated copies of the same posting into one canonical job (the one
+    with the fullest description). The other copies' links are kept on the canonical
+    job as `alternate_apply_urls`. Input order is preserved.
+    """
+    clusters = find_duplicate_clusters(jobs, threshold)
+    collapsed = []
+    for cluster in clusters:
+        members = [jobs[i] for i in cluster]
+        canonical = max(members, key=lambda j: len(j.get("description") or ""))
+        seen_urls = {canonical.get("apply_url")}
+        alternates = list(canonical.get("alternate_apply_urls") or [])
+        for job in members:
+            url = job.get("apply_url")
+            if job is canonical or not url or url in seen_urls:
+                continue
+            seen_urls.add(url)
+            alternates.append({"source": job.get("source"), "apply_url": url})
+        canonical["alternate_apply_urls"] = alternates
+        collapsed.append(canonical)
+
+    if len(collapsed) < len(jobs):
+        logger.info(f"Collapsed {len(jobs) - len(collapsed)} near-duplicate jobs ({len(jobs)} -> {len(collapsed)})")
+    return collapsed
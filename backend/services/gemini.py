@@ -2,21 +2,54 @@ import os
 import json
 import re
 import asyncio
+import hashlib
 import logging
 import google.generativeai as genai
-from typing import List, Dict, Any
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from backend.services.cache import cache_service
+from backend.services.relevance import local_rank, prefilter, apply_local_scores, sort_ranked
+from backend.services.ratelimit import gemini_limiter, estimate_tokens, PRIORITY_INTERACTIVE
+from backend.services.metrics import track_upstream
+from backend.services.replay import upstream_recorder
 
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path)
 logger = logging.getLogger(__name__)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+DEFAULT_TIPS = [{"tip": "Tailor your resume.", "icon": "📝"}, {"tip": "Network on LinkedIn.", "icon": "🤝"}, {"tip": "Prepare for interviews.", "icon": "🎯"}]
+
+# rank_jobs splits large result sets into prompts of at most this many job tokens / jobs
+RANK_CHUNK_TOKENS = int(os.getenv("RANK_CHUNK_TOKENS", "3000"))
+RANK_CHUNK_MAX_JOBS = int(os.getenv("RANK_CHUNK_MAX_JOBS", "30"))
+# Jobs repeated in every chunk so chunk scores can be put on one scale
+RANK_ANCHOR_COUNT = int(os.getenv("RANK_ANCHOR_COUNT", "2"))
+# Only the locally most relevant jobs are sent to Gemini, the rest keep their keyword score
+RANK_PREFILTER_TOP_K = int(os.getenv("RANK_PREFILTER_TOP_K", "60"))
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 # We use a global model instance or create it locally
 # Using gemini-1.5-flash as specified
 
+async def _generate(model, prompt: str, operation: str):
+    """
+    Single place every Gemini call goes through, timed and error-counted per operation.
+    Only the response text is used by callers, so that is what gets recorded and replayed.
+    """
+    async def request() -> str:
+        # Replayed answers never get here, so they are not counted as Gemini calls
+        with track_upstream("gemini", operation):
+            response = await model.generate_content_async(prompt)
+            return response.text
+
+    text = await upstream_recorder.call(
+        "gemini", {"model": getattr(model, "model_name", ""), "operation": operation, "prompt": prompt}, request
+    )
+    return SimpleNamespace(text=text)
+
 def safe_parse_json(text: str) -> Any:
     """Safely extracts and parses JSON from Gemini's response, handling markdown fences."""
     try:
@@ -59,99 +92,214 @@ def safe_parse_json(text: str) -> Any:
     logger.error(f"Failed to parse JSON from Gemini response: {text[:100]}...")
     return None
 
-async def rank_jobs(jobs: List[dict], role: str, experience: int, resume_text: str = None) -> List[dict]:
+def _job_cache_id(job: dict) -> str:
+    """Stable identity for a listing: SerpAPI job_id, or a content hash for fallback ids."""
+    ext_id = str(job.get("external_id") or "")
+    if ext_id and not ext_id.startswith("fallback_"):
+        return ext_id
+    content = f"{job.get('title', '')}|{job.get('company', '')}|{(job.get('description') or '')[:500]}"
+    return "sha1_" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+def _resume_hash(resume_text: str = None) -> str:
+    if not resume_text:
+        return "none"
+    return hashlib.sha1(resume_text.encode("utf-8")).hexdigest()[:16]
+
+def _slim_job(job: dict) -> dict:
+    return {
+        "id": str(job.get("external_id") or job.get("id")),
+        "title": job.get("title"),
+        "company": job.get("company"),
+        "desc": (job.get("description") or "")[:200]
+    }
+
+def _match_score(job: dict, score_map: Dict[str, dict]) -> Optional[dict]:
+    # We must check against BOTH id and external_id string representations because Gemini could have returned either depending on the schema!
+    ext_id = str(job.get("external_id", ""))
+    db_id = str(job.get("id", ""))
+    if ext_id and ext_id in score_map:
+        return score_map[ext_id]
+    if db_id and db_id in score_map:
+        return score_map[db_id]
+    return None
+
+def _build_chunks(slim_jobs: List[dict]) -> List[List[dict]]:
+    """Split slim jobs into prompts that fit RANK_CHUNK_TOKENS and RANK_CHUNK_MAX_JOBS."""
+    chunks, current, current_tokens = [], [], 0
+    for slim in slim_jobs:
+        tokens = estimate_tokens(json.dumps(slim))
+        if current and (current_tokens + tokens > RANK_CHUNK_TOKENS or len(current) >= RANK_CHUNK_MAX_JOBS):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(slim)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def _score_chunk(model, slim_jobs: List[dict], role: str, experience: int, resume_context: str, priority: int) -> Dict[str, dict]:
+    """Ask Gemini to score one chunk; returns {id: {"score", "reason"}}."""
+    prompt = f"""
+        Rank the following job listings for a '{role}' with {experience} years of experience in India.
+        {resume_context}
+        For each job, provide a relevance score (0-100) and a short 1-sentence reason.
+        Respond ONLY with a JSON array of objects, containing 'id', 'score' (number), and 'reason' (string).
+        Jobs:
+        {json.dumps(slim_jobs)}
+        """
+
+    # We need an async wrapper or thread executor for Gemini since google.generativeai isn't fully async
+    # But `generate_content_async` exists in modern SDK:
+    async with gemini_limiter.acquire(estimate_tokens(prompt, 60 * len(slim_jobs)), priority):
+        response = await _generate(model, prompt, "rank")
+
+    parsed = safe_parse_json(response.text)
+    if not parsed or not isinstance(parsed, list):
+        raise Exception("Invalid JSON returned")
+
+    return {
+        str(item.get("id")): {"score": float(item.get("score", 50)), "reason": item.get("reason", "Good match")}
+        for item in parsed if isinstance(item, dict)
+    }
+
+def _calibrate(chunk_maps: List[Optional[Dict[str, dict]]], anchor_ids: List[str]) -> None:
+    """
+    Shift every chunk so its anchor scores line up with the first chunk's, making
+    scores from separately prompted chunks comparable. Adjusts the maps in place.
+    """
+    reference = chunk_maps[0]
+    if not reference:
+        return
+    for score_map in chunk_maps[1:]:
+        if not score_map:
+            continue
+        shared = [a for a in anchor_ids if a in reference and a in score_map]
+        if not shared:
+            continue
+        offset = sum(reference[a]["score"] - score_map[a]["score"] for a in shared) / len(shared)
+        for item in score_map.values():
+            item["score"] = min(100.0, max(0.0, item["score"] + offset))
+        # Anchors keep the reference chunk's verdict
+        for a in shared:
+            score_map[a] = reference[a]
+
+async def rank_jobs(jobs: List[dict], role: str, experience: int, resume_text: str = None, priority: int = PRIORITY_INTERACTIVE) -> List[dict]:
     """Score each job from 0-100 and add ai_score, ai_reason."""
     if not jobs:
         return []
-    if not GEMINI_API_KEY:
-        for j in jobs:
-            j["ai_score"] = 50
-            j["ai_reason"] = "AI ranking disabled (No API Key)"
-        return jobs
+    if not GEMINI_API_KEY and not upstream_recorder.replaying:
+        return local_rank(jobs, role, experience, resume_text, reason="Keyword match (AI ranking disabled)")
+
+    # Reuse scores from earlier searches, only unseen jobs go into the prompt
+    resume_hash = _resume_hash(resume_text)
+    score_keys = [cache_service.score_key(role, experience, resume_hash, _job_cache_id(j)) for j in jobs]
+    cached_scores = await cache_service.get_job_scores(score_keys)
+
+    unscored = []
+    for j, key in zip(jobs, score_keys):
+        cached = cached_scores.get(key)
+        if cached:
+            j["ai_score"] = int(cached["score"])
+            j["ai_reason"] = cached["reason"]
+            j["ai_ranked"] = True
+        else:
+            unscored.append((j, key))
+    logger.info(f"rank_jobs: {len(jobs) - len(unscored)} cached scores, {len(unscored)} jobs to score")
+
+    if not unscored:
+        return sort_ranked(jobs)
+
+    # Local BM25 pass: it is the fallback score for every unscored job, and only
+    # the RANK_PREFILTER_TOP_K most relevant ones are worth Gemini tokens
+    unscored_jobs = [j for j, _ in unscored]
+    top_idx, rest_idx, local = prefilter(unscored_jobs, role, experience, RANK_PREFILTER_TOP_K, resume_text)
+    apply_local_scores([unscored_jobs[i] for i in rest_idx], local[rest_idx], "Keyword match (not AI-ranked)")
+    local_by_job = {id(j): float(score) for j, score in zip(unscored_jobs, local)}
+    unscored = [unscored[i] for i in top_idx]
+
+    def fallback(job: dict, reason: str) -> None:
+        job["ai_score"] = int(round(local_by_job[id(job)]))
+        job["ai_reason"] = reason
+        job["ai_ranked"] = False
         
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash-8b') # using 8b if possible or just flash
-        # We'll use the standard 'gemini-1.5-flash'
         model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Limit to 30 jobs to save tokens
-        slim_jobs = []
-        for j in jobs[:30]:
-            slim = {
-                "id": str(j.get("external_id") or j.get("id")),
-                "title": j.get("title"),
-                "company": j.get("company"),
-                "desc": j.get("description", "")[:200]
-            }
-            slim_jobs.append(slim)
-            
+
         resume_context = ""
         if resume_text:
             resume_context = f"Also consider this candidate's resume summary:\n{resume_text[:1000]}\n"
-            
-        prompt = f"""
-        Rank the following job listings for a '{role}' with {experience} years of experience in India.
-        {resume_context}
-        For each job, provide a relevance score (0-100) and a short 1-sentence reason.
-        Respond ONLY with a JSON array of objects, containing 'id', 'score' (number), and 'reason' (string).
-        Jobs:
-        {json.dumps(slim_jobs)}
-        """
-        
-        await asyncio.sleep(2) # rate limit prevention
-        
-        # We need an async wrapper or thread executor for Gemini since google.generativeai isn't fully async
-        # But `generate_content_async` exists in modern SDK:
-        response = await model.generate_content_async(prompt)
-        
-        parsed = safe_parse_json(response.text)
-        if not parsed or not isinstance(parsed, list):
-            raise Exception("Invalid JSON returned")
-            
-        logger.error(f"DEBUG - Parsed JSON: {parsed}")
-        score_map = {str(item.get("id")): {"score": item.get("score", 50), "reason": item.get("reason", "Good match")} for item in parsed if isinstance(item, dict)}
-        logger.error(f"DEBUG - Score Map: {score_map}")
-        
-        for j in jobs:
-            # We must check against BOTH id and external_id string representations because Gemini could have returned either depending on the schema!
-            ext_id = str(j.get("external_id", ""))
-            db_id = str(j.get("id", ""))
-            
-            logger.error(f"DEBUG Loop - ext_id: {ext_id}, db_id: {db_id}, in map? {ext_id in score_map or db_id in score_map}")
-            
-            if ext_id and ext_id in score_map:
-                j["ai_score"] = int(score_map[ext_id]["score"])
-                j["ai_reason"] = score_map[ext_id]["reason"]
-            elif db_id and db_id in score_map:
-                j["ai_score"] = int(score_map[db_id]["score"])
-                j["ai_reason"] = score_map[db_id]["reason"]
+
+        # Token-budgeted chunks scored concurrently under the shared limiter.
+        # With more than one chunk, the first few jobs ride along in every chunk as anchors.
+        slim_jobs = [_slim_job(j) for j, _ in unscored]
+        chunks = _build_chunks(slim_jobs)
+        anchors = chunks[0][:RANK_ANCHOR_COUNT] if len(chunks) > 1 else []
+        anchor_ids = [a["id"] for a in anchors]
+        for chunk in chunks[1:]:
+            chunk.extend(anchors)
+
+        results = await asyncio.gather(
+            *[_score_chunk(model, chunk, role, experience, resume_context, priority) for chunk in chunks],
+            return_exceptions=True
+        )
+        chunk_maps = []
+        for i, res in enumerate(results):
+            if isinstance(res, Exception):
+                logger.error(f"Gemini rank_jobs chunk {i + 1}/{len(chunks)} error: {str(res)}")
+                chunk_maps.append(None)
             else:
-                j["ai_score"] = 50
-                j["ai_reason"] = "Standard match"
+                chunk_maps.append(res)
+        if all(m is None for m in chunk_maps):
+            raise Exception("All ranking chunks failed")
+
+        _calibrate(chunk_maps, anchor_ids)
+
+        # Which chunk each job was sent in (anchors count as the first chunk)
+        chunk_of = {}
+        for i, chunk in enumerate(chunks):
+            for slim in chunk:
+                chunk_of.setdefault(slim["id"], i)
+
+        new_scores = {}
+        for (j, key), slim in zip(unscored, slim_jobs):
+            score_map = chunk_maps[chunk_of[slim["id"]]]
+            if score_map is None:
+                fallback(j, "Keyword match (AI ranking failed)")
+                continue
+
+            match = _match_score(j, score_map)
+            if match:
+                j["ai_score"] = int(round(match["score"]))
+                j["ai_reason"] = match["reason"]
+                j["ai_ranked"] = True
+                new_scores[key] = {"score": j["ai_score"], "reason": j["ai_reason"]}
+            else:
+                fallback(j, "Standard match")
+
+        # Only real model scores are cached, placeholders get another chance next time
+        await cache_service.cache_job_scores(new_scores)
                 
-        # Sort by ai_score descending
-        jobs.sort(key=lambda x: x.get("ai_score", 0), reverse=True)
-        return jobs
+        # Model scores first, keyword-matched jobs after them (the two scales don't compare)
+        return sort_ranked(jobs)
         
     except Exception as e:
         import traceback
         logger.error(f"Gemini rank_jobs error: {str(e)}")
         logger.error(traceback.format_exc())
-        for j in jobs:
-            j["ai_score"] = 50
-            j["ai_reason"] = "Ranking failed"
-        return jobs
+        for j, _ in unscored:
+            fallback(j, "Keyword match (AI ranking failed)")
+        return sort_ranked(jobs)
 
-async def get_search_tips(role: str, experience: int) -> List[dict]:
-    if not GEMINI_API_KEY:
-        return [{"tip": "Tailor your resume.", "icon": "📝"}, {"tip": "Network on LinkedIn.", "icon": "🤝"}, {"tip": "Prepare for interviews.", "icon": "🎯"}]
+async def get_search_tips(role: str, experience: int, priority: int = PRIORITY_INTERACTIVE) -> List[dict]:
+    if not GEMINI_API_KEY and not upstream_recorder.replaying:
+        return DEFAULT_TIPS
         
     try:
         model = genai.GenerativeModel('gemini-2.5-flash')
         prompt = f"Provide exactly 3 concise job search tips for a {role} with {experience} years experience in India. Output strictly as JSON array with objects containing 'tip' (string) and 'icon' (emoji)."
         
-        await asyncio.sleep(2)
-        response = await model.generate_content_async(prompt)
+        async with gemini_limiter.acquire(estimate_tokens(prompt, 150), priority):
+            response = await _generate(model, prompt, "tips")
         parsed = safe_parse_json(response.text)
         
         if parsed and isinstance(parsed, list) and len(parsed) > 0:
@@ -159,10 +307,10 @@ async def get_search_tips(role: str, experience: int) -> List[dict]:
     except Exception as e:
         logger.error(f"Gemini get_search_tips error: {str(e)}")
         
-    return [{"tip": "Tailor your resume.", "icon": "📝"}, {"tip": "Network on LinkedIn.", "icon": "🤝"}, {"tip": "Prepare for interviews.", "icon": "🎯"}]
+    return DEFAULT_TIPS
 
-async def generate_cover_letter(job: dict, user_name: str) -> str:
-    if not GEMINI_API_KEY:
+async def generate_cover_letter(job: dict, user_name: str, priority: int = PRIORITY_INTERACTIVE) -> str:
+    if not GEMINI_API_KEY and not upstream_recorder.replaying:
         return "Cover letter generation requires AI API key."
         
     try:
@@ -174,8 +322,8 @@ async def generate_cover_letter(job: dict, user_name: str) -> str:
         Make it professional and concise.
         """
         
-        await asyncio.sleep(2)
-        response = await model.generate_content_async(prompt)
+        async with gemini_limiter.acquire(estimate_tokens(prompt, 500), priority):
+            response = await _generate(model, prompt, "cover_letter")
         if response.text:
             return response.text.strip()
     except Exception as e:
@@ -183,9 +331,9 @@ async def generate_cover_letter(job: dict, user_name: str) -> str:
         
     return "Error generating cover letter. Please try again."
 
-async def optimize_search_queries(role: str, experience: int) -> List[str]:
+async def optimize_search_queries(role: str, experience: int, priority: int = PRIORITY_INTERACTIVE) -> List[str]:
     fallback = [f"{role} jobs India", f"{role} hiring India"]
-    if not GEMINI_API_KEY:
+    if not GEMINI_API_KEY and not upstream_recorder.replaying:
         return fallback
         
     try:
@@ -197,8 +345,8 @@ async def optimize_search_queries(role: str, experience: int) -> List[str]:
         Example format: ["Query 1", "Query 2", ...]
         """
         
-        await asyncio.sleep(2)
-        response = await model.generate_content_async(prompt)
+        async with gemini_limiter.acquire(estimate_tokens(prompt, 100), priority):
+            response = await _generate(model, prompt, "queries")
         parsed = safe_parse_json(response.text)
         
         if parsed and isinstance(parsed, list) and len(parsed) > 0:
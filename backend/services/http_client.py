@@ -0,0 +1,71 @@
+import os
+import logging
+import httpx
+from typing import Optional
+from dotenv import load_dotenv
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path)
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class HttpClient:
+    """App-lifetime httpx client so upstream connections are reused across requests."""
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def _build(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        http2 = HTTP2_ENABLED and _http2_available()
+        if HTTP2_ENABLED and not http2:
+            logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                connect=HTTP_CONNECT_TIMEOUT,
+                read=HTTP_READ_TIMEOUT,
+                write=HTTP_READ_TIMEOUT,
+                pool=HTTP_POOL_TIMEOUT
+            ),
+            transport=transport
+        )
+
+    async def connect(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        """Create the shared client; pass a transport (e.g. httpx.MockTransport) in tests."""
+        if self.client is not None:
+            await self.disconnect()
+        self.client = self._build(transport)
+        logger.info("Shared HTTP client started.")
+
+    async def disconnect(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            logger.info("Shared HTTP client closed.")
+
+    def get(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it on first use outside the app lifecycle."""
+        if self.client is None:
+            self.client = self._build()
+        return self.client
+
+http_client = HttpClient()
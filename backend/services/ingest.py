@@ -0,0 +1,76 @@
+import json
+import logging
+from typing import List
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Single-statement upsert: every column is shipped as one array parameter and
+# expanded server-side with unnest(), so a batch costs one round trip.
+UPSERT_JOBS_SQL = """
+INSERT INTO jobs (external_id, title, company, location, description, source, apply_url, salary_range, posted_at, alternate_apply_urls, experience_min)
+SELECT t.external_id, t.title, t.company, t.location, t.description, t.source, t.apply_url, t.salary_range, t.posted_at, t.alternate_apply_urls, $11::int
+FROM unnest(
+    $1::text[], $2::text[], $3::text[], $4::text[], $5::text[],
+    $6::text[], $7::text[], $8::text[], $9::timestamptz[], $10::jsonb[]
+) AS t(external_id, title, company, location, description, source, apply_url, salary_range, posted_at, alternate_apply_urls)
+ON CONFLICT (external_id) DO UPDATE SET
+    title = EXCLUDED.title,
+    description = EXCLUDED.description,
+    apply_url = EXCLUDED.apply_url,
+    source = EXCLUDED.source,
+    -- a later batch without duplicates should not wipe links found earlier
+    alternate_apply_urls = CASE
+        WHEN jsonb_array_length(EXCLUDED.alternate_apply_urls) > 0 THEN EXCLUDED.alternate_apply_urls
+        ELSE jobs.alternate_apply_urls
+    END,
+    fetched_at = now()
+RETURNING id, external_id, title, company, location, description, source, apply_url, salary_range, posted_at, alternate_apply_urls
+"""
+
+async def upsert_jobs(db: asyncpg.Connection, jobs: List[dict], experience: int) -> List[dict]:
+    """
+    Upsert scraped jobs in one statement and return the stored rows
+    (with `id` as a string) in the same order as the input.
+    """
+    if not jobs:
+        return []
+
+    # ON CONFLICT cannot touch the same row twice in one statement,
+    # so keep only the first occurrence of each external_id.
+    unique_jobs = []
+    seen_ids = set()
+    for job in jobs:
+        if job["external_id"] in seen_ids:
+            continue
+        seen_ids.add(job["external_id"])
+        unique_jobs.append(job)
+
+    # Concurrent searches upsert overlapping listings; taking the row locks in one
+    # global order (by external_id) keeps two batches from deadlocking each other
+    batch = sorted(unique_jobs, key=lambda j: j["external_id"])
+    rows = await db.fetch(
+        UPSERT_JOBS_SQL,
+        [j["external_id"] for j in batch],
+        [j["title"] for j in batch],
+        [j["company"] for j in batch],
+        [j.get("location") for j in batch],
+        [j.get("description") for j in batch],
+        [j.get("source") for j in batch],
+        [j.get("apply_url") for j in batch],
+        [j.get("salary_range") for j in batch],
+        [j.get("posted_at") for j in batch],
+        [json.dumps(j.get("alternate_apply_urls") or []) for j in batch],
+        experience
+    )
+
+    # RETURNING order is not guaranteed, restore the scraper's ordering
+    by_external_id = {}
+    for row in rows:
+        job_dict = dict(row)
+        job_dict["id"] = str(job_dict["id"])
+        job_dict["alternate_apply_urls"] = json.loads(job_dict["alternate_apply_urls"] or "[]")
+        by_external_id[job_dict["external_id"]] = job_dict
+
+    logger.info(f"Upserted {len(by_external_id)} jobs in one batch")
+    return [by_external_id[j["external_id"]] for j in unique_jobs if j["external_id"] in by_external_id]
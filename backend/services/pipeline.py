@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from backend.services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Marker for stages that have no fallback: their errors propagate to the caller
+NO_FALLBACK = object()
+
+class Stage:
+    """
+    One step of a pipeline. `fn` receives the results of finished stages by name
+    and may only rely on the ones listed in `deps`. On error or timeout the stage
+    resolves to `fallback` (a value, or a callable taking the same results dict).
+    A stage with `cancel_if` is abandoned, also resolving to its fallback, as soon as
+    cancel_if(results) is true after some other stage finishes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any]], Awaitable[Any]],
+        deps: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        fallback: Any = NO_FALLBACK,
+        cancel_if: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ):
+        if cancel_if is not None and fallback is NO_FALLBACK:
+            raise ValueError(f"Stage '{name}' has cancel_if but no fallback to resolve to")
+        self.name = name
+        self.fn = fn
+        self.deps = deps or []
+        self.timeout = timeout
+        self.fallback = fallback
+        self.cancel_if = cancel_if
+
+    def resolve_fallback(self, results: Dict[str, Any]) -> Any:
+        return self.fallback(results) if callable(self.fallback) else self.fallback
+
+async def _run_stage(stage: Stage, results: Dict[str, Any]) -> Any:
+    try:
+        with span(stage.name):
+            return await asyncio.wait_for(stage.fn(results), timeout=stage.timeout)
+    except Exception as e:
+        if stage.fallback is NO_FALLBACK:
+            raise
+        reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed: {str(e)}"
+        logger.error(f"Pipeline stage '{stage.name}' {reason}, using fallback")
+        return stage.resolve_fallback(results)
+
+async def run_dag(stages: List[Stage],
+                  on_done: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Run stages as soon as their dependencies finish, so independent stages overlap.
+    Returns every stage's result by name. If a stage without fallback fails, the
+    remaining stages are cancelled and the error is raised.
+    `on_done(name, results)` is called whenever a stage resolves, fallbacks included,
+    so callers can publish partial results while the rest is still running.
+    """
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        for dep in s.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{s.name}' depends on unknown stage '{dep}'")
+
+    results: Dict[str, Any] = {}
+    pending = {s.name: s for s in stages}
+    running: Dict[asyncio.Task, str] = {}
+
+    try:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(dep in results for dep in stage.deps):
+                    del pending[name]
+                    running[asyncio.create_task(_run_stage(stage, results))] = name
+
+            if not running:
+                raise ValueError(f"Pipeline has a dependency cycle: {sorted(pending)}")
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                results[name] = task.result()
+                if on_done is not None:
+                    on_done(name, results)
+
+            for task, name in list(running.items()):
+                stage = by_name[name]
+                if stage.cancel_if is not None and stage.cancel_if(results):
+                    task.cancel()
+                    del running[task]
+                    logger.info(f"Pipeline stage '{name}' no longer needed, cancelled")
+                    results[name] = stage.resolve_fallback(results)
+                    if on_done is not None:
+                        on_done(name, results)
+            for name, stage in list(pending.items()):
+                if stage.cancel_if is not None and stage.cancel_if(results):
+                    del pending[name]
+                    results[name] = stage.resolve_fallback(results)
+                    if on_done is not None:
+                        on_done(name, results)
+    finally:
+        for task in running:
+            task.cancel()
+
+    return results
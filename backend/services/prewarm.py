@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from backend.services.cache import cache_service, normalize_role
+from backend.services.singleflight import search_flight
+from backend.services.search import run_search_pipeline, SEARCH_PIPELINE_DEADLINE
+from backend.services.ratelimit import PRIORITY_BACKGROUND
+from backend.services.tracing import detached_task
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path)
+logger = logging.getLogger(__name__)
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "false").lower() == "true"
+PREWARM_INTERVAL = int(os.getenv("PREWARM_INTERVAL", "1800"))
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "10"))
+# Popularity is counted per day; the worker looks at today plus the previous days in the window
+PREWARM_WINDOW_DAYS = int(os.getenv("PREWARM_WINDOW_DAYS", "2"))
+
+# Request-path counts are pushed to Redis at most this often (seconds)
+POPULARITY_FLUSH_INTERVAL = 60
+# Cap on distinct keys buffered in memory; reaching it triggers an early flush
+MAX_PENDING_KEYS = 5000
+
+class SearchPopularity:
+    """
+    Counts searches per normalized (role, experience). Counting is a dict increment
+    on the request path; counts are flushed to per-day Redis sorted sets in the
+    background so every API worker contributes to one shared ranking.
+    """
+
+    def __init__(self):
+        self._pending: Counter = Counter()
+        self._local_totals: Counter = Counter()
+        self._last_flush = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _member(self, role: str, experience: int) -> str:
+        # Same normalization as the cache keys, so a popular member maps to exactly one cached search
+        return f"{normalize_role(role)}|{experience}"
+
+    def _day_key(self, day: datetime) -> str:
+        return f"search_freq:{day.strftime('%Y%m%d')}"
+
+    def record(self, role: str, experience: int) -> None:
+        self._pending[self._member(role, experience)] += 1
+
+        flush_idle = self._flush_task is None or self._flush_task.done()
+        if len(self._pending) >= MAX_PENDING_KEYS:
+            if flush_idle:
+                self._start_flush()
+            else:
+                # A flush is already in flight: keep the buffer bounded by dropping
+                # the least searched half, which cannot change the top of the ranking
+                for member, _ in self._pending.most_common()[MAX_PENDING_KEYS // 2:]:
+                    del self._pending[member]
+        elif flush_idle and time.monotonic() - self._last_flush >= POPULARITY_FLUSH_INTERVAL:
+            self._start_flush()
+
+    def _start_flush(self) -> None:
+        # The buffer is swapped right away so counts recorded meanwhile go to the next flush
+        self._last_flush = time.monotonic()
+        pending, self._pending = self._pending, Counter()
+        self._flush_task = detached_task(self._push(pending))
+
+    async def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        pending, self._pending = self._pending, Counter()
+        await self._push(pending)
+
+    async def _push(self, pending: Counter) -> None:
+        if not pending:
+            return
+        if not cache_service.redis:
+            self._local_totals.update(pending)
+            return
+
+        key = self._day_key(datetime.now(timezone.utc))
+        try:
+            pipe = cache_service.redis.pipeline(transaction=False)
+            for member, count in pending.items():
+                pipe.zincrby(key, count, member)
+            pipe.expire(key, (PREWARM_WINDOW_DAYS + 1) * 86400)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Search popularity flush error: {str(e)}")
+            self._local_totals.update(pending)
+
+    async def top(self, n: int) -> List[Tuple[str, int]]:
+        """Most searched (role, experience) pairs over the window."""
+        totals = Counter(self._local_totals)
+        if cache_service.redis:
+            today = datetime.now(timezone.utc)
+            try:
+                pipe = cache_service.redis.pipeline(transaction=False)
+                for d in range(PREWARM_WINDOW_DAYS):
+                    pipe.zrevrange(self._day_key(today - timedelta(days=d)), 0, n * 2, withscores=True)
+                for day in await pipe.execute():
+                    for member, score in day:
+                        if isinstance(member, bytes):
+                            member = member.decode("utf-8")
+                        totals[member] += score
+            except Exception as e:
+                logger.error(f"Search popularity read error: {str(e)}")
+
+        result = []
+        for member, _ in totals.most_common(n):
+            role, _, experience = member.rpartition("|")
+            result.append((role, int(experience)))
+        return result
+
+class PrewarmWorker:
+    """Periodically re-runs the search pipeline for popular searches whose cache is missing or stale."""
+
+    def __init__(self, popularity: SearchPopularity):
+        self.popularity = popularity
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self, top_n: int = PREWARM_TOP_N) -> int:
+        """Warm the top searches once. Returns how many pipelines were run."""
+        await self.popularity.flush()
+        warmed = 0
+        for role, experience in await self.popularity.top(top_n):
+            cached = await cache_service.get_cached_search(role, experience)
+            if cached is not None and not cached["stale"]:
+                continue
+            try:
+                # Sequential on purpose: warming should not burst SerpAPI or Gemini quota
+                await search_flight.do(
+                    cache_service.search_key(role, experience),
+                    lambda: run_search_pipeline(role, experience, priority=PRIORITY_BACKGROUND),
+                    wait_timeout=SEARCH_PIPELINE_DEADLINE
+                )
+                warmed += 1
+            except Exception as e:
+                logger.error(f"Pre-warm failed for '{role}' / {experience}: {str(e)}")
+        logger.info(f"Pre-warm cycle finished, {warmed} searches refreshed")
+        return warmed
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Pre-warm cycle error: {str(e)}")
+            await asyncio.sleep(PREWARM_INTERVAL)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+search_popularity = SearchPopularity()
+prewarm_worker = PrewarmWorker(search_popularity)
@@ -0,0 +1,164 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from typing import Dict, List
+from dotenv import load_dotenv
+from backend.services.tracing import detached_task
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path)
+logger = logging.getLogger(__name__)
+
+# Limits of our Gemini plan; defaults are the gemini-2.5-flash free tier
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "10"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "250000"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+
+# Lower value runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+def estimate_tokens(prompt: str, expected_output: int = 0) -> int:
+    """Rough token count (~4 chars per token) used to charge the TPM bucket."""
+    return len(prompt) // 4 + expected_output
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(per_minute, 1))
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it already is)."""
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+class RateLimiter:
+    """
+    Async request/token bucket plus a concurrency cap. Callers queue by priority
+    and only wait when the buckets or the concurrency limit actually require it.
+    """
+
+    def __init__(self, rpm: int = GEMINI_RPM, tpm: int = GEMINI_TPM, max_concurrency: int = GEMINI_MAX_CONCURRENCY):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self._stats = {
+            "granted": 0,
+            "waited": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "granted_by_priority": {}
+        }
+
+    def _can_grant(self, tokens: int) -> bool:
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return (
+            self.in_flight < self.max_concurrency
+            and self.requests.wait_time(1) == 0
+            and self.tokens.wait_time(tokens) == 0
+        )
+
+    def _grant(self, tokens: int, priority: int, waited: float) -> None:
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.in_flight += 1
+        self._stats["granted"] += 1
+        by_priority = self._stats["granted_by_priority"]
+        by_priority[priority] = by_priority.get(priority, 0) + 1
+        if waited > 0:
+            self._stats["waited"] += 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            priority, _, enqueued_at, tokens, future = self._waiters[0]
+            if future.done():
+                # Caller was cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+
+            if self._can_grant(tokens):
+                heapq.heappop(self._waiters)
+                self._grant(tokens, priority, time.monotonic() - enqueued_at)
+                future.set_result(None)
+                continue
+
+            # Sleep until the buckets refill or a slot is released, whichever comes first
+            delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay if delay > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+        self._dispatcher = None
+
+    async def _acquire(self, tokens: int, priority: int) -> None:
+        if not self._waiters and self._can_grant(tokens):
+            self._grant(tokens, priority, 0.0)
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), time.monotonic(), tokens, future))
+        if self._dispatcher is None:
+            # Shared by every waiter, so it must not hold on to this request's trace
+            self._dispatcher = detached_task(self._dispatch())
+        else:
+            self._wakeup.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Cancelled right after being granted: hand the slot back
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0, priority: int = PRIORITY_INTERACTIVE):
+        """Hold one request slot charged with `tokens` for the duration of the block."""
+        await self._acquire(tokens, priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict:
+        waited = self._stats["waited"]
+        return {
+            "queue_depth": sum(1 for w in self._waiters if not w[4].done()),
+            "in_flight": self.in_flight,
+            "granted": self._stats["granted"],
+            "granted_by_priority": dict(self._stats["granted_by_priority"]),
+            "waited": waited,
+            "wait_seconds_avg": self._stats["wait_seconds_total"] / waited if waited else 0.0,
+            "wait_seconds_max": self._stats["wait_seconds_max"]
+        }
+
+gemini_limiter = RateLimiter()
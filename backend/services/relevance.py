@@ -0,0 +1,132 @@
+import re
+import logging
+from collections import Counter
+from typing import List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters; titles are counted several times so a title hit outweighs a passing mention
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_WEIGHT = 3
+
+# Local scores are squeezed into this band so they never look like confident AI verdicts.
+# They are not comparable with model scores either: jobs carry ai_ranked so the two sort apart.
+LOCAL_SCORE_MIN = 10
+LOCAL_SCORE_MAX = 90
+# How much more a term of the typed role counts than a seniority hint
+ROLE_QUERY_WEIGHT = 3
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "our", "that", "the", "this", "to", "we", "will", "with", "you",
+    "your", "job", "jobs", "india", "years", "year", "experience", "role", "work"
+}
+
+SENIOR_TERMS = {"senior", "sr", "lead", "principal", "staff", "head", "manager", "architect", "director"}
+JUNIOR_TERMS = {"junior", "jr", "intern", "internship", "trainee", "fresher", "graduate", "entry"}
+
+TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+def _seniority_terms(experience: int) -> List[str]:
+    if experience <= 1:
+        return ["junior", "fresher", "entry"]
+    if experience >= 6:
+        return ["senior", "lead"]
+    return []
+
+def bm25_scores(jobs: List[dict], query: str) -> np.ndarray:
+    """
+    BM25 score of every job (title + description) against a free-text query.
+    A term repeated in the query counts that many times, so callers weigh terms by repeating them.
+    """
+    n = len(jobs)
+    if n == 0:
+        return np.zeros(0)
+
+    query_counts = Counter(tokenize(query))
+    if not query_counts:
+        return np.zeros(n)
+    query_terms = sorted(query_counts)
+    vocab = {t: i for i, t in enumerate(query_terms)}
+    query_weight = np.array([query_counts[t] for t in query_terms], dtype=np.float32)
+
+    # Only query terms matter for BM25, so the term matrix is jobs x query terms
+    tf = np.zeros((n, len(vocab)), dtype=np.float32)
+    doc_len = np.zeros(n, dtype=np.float32)
+    for d, job in enumerate(jobs):
+        tokens = tokenize(job.get("title")) * TITLE_WEIGHT + tokenize(job.get("description"))
+        doc_len[d] = len(tokens)
+        for t in tokens:
+            i = vocab.get(t)
+            if i is not None:
+                tf[d, i] += 1
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+    avg_len = max(float(doc_len.mean()), 1.0)
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_len / avg_len)
+    weighted = tf * (BM25_K1 + 1.0) / (tf + norm[:, None])
+    return weighted @ (idf * query_weight)
+
+def _seniority_penalty(jobs: List[dict], experience: int) -> np.ndarray:
+    """Multiplier < 1 for titles clearly aimed at a different seniority."""
+    penalty = np.ones(len(jobs), dtype=np.float32)
+    for d, job in enumerate(jobs):
+        title_terms = set(tokenize(job.get("title")))
+        if experience <= 2 and title_terms & SENIOR_TERMS:
+            penalty[d] = 0.6
+        elif experience >= 5 and title_terms & JUNIOR_TERMS:
+            penalty[d] = 0.6
+    return penalty
+
+def local_scores(jobs: List[dict], role: str, experience: int, resume_text: Optional[str] = None) -> np.ndarray:
+    """
+    Relevance of each job on a LOCAL_SCORE_MIN..LOCAL_SCORE_MAX scale, computed
+    offline. Accepts the dicts produced by the scraper or read back from the DB.
+    """
+    if not jobs:
+        return np.zeros(0)
+
+    # The role is what the user typed, weigh it above resume keywords
+    query = " ".join([role] * ROLE_QUERY_WEIGHT + _seniority_terms(experience))
+    raw = bm25_scores(jobs, query)
+    if resume_text:
+        raw = raw + 0.3 * bm25_scores(jobs, resume_text[:2000])
+    raw = raw * _seniority_penalty(jobs, experience)
+
+    top = float(raw.max())
+    if top <= 0:
+        return np.full(len(jobs), float(LOCAL_SCORE_MIN))
+    return LOCAL_SCORE_MIN + (LOCAL_SCORE_MAX - LOCAL_SCORE_MIN) * raw / top
+
+def apply_local_scores(jobs: List[dict], scores: np.ndarray, reason: str) -> None:
+    for job, score in zip(jobs, scores):
+        job["ai_score"] = int(round(float(score)))
+        job["ai_reason"] = reason
+        job["ai_ranked"] = False
+
+def sort_ranked(jobs: List[dict]) -> List[dict]:
+    """Model-scored jobs first, then locally scored ones, each by score. Jobs without the flag count as model-scored."""
+    jobs.sort(key=lambda x: (x.get("ai_ranked", True), x.get("ai_score", 0)), reverse=True)
+    return jobs
+
+def local_rank(jobs: List[dict], role: str, experience: int, resume_text: Optional[str] = None,
+               reason: str = "Keyword match (AI ranking unavailable)") -> List[dict]:
+    """Score and sort jobs without any network call."""
+    apply_local_scores(jobs, local_scores(jobs, role, experience, resume_text), reason)
+    return sort_ranked(jobs)
+
+def prefilter(jobs: List[dict], role: str, experience: int, top_k: int,
+              resume_text: Optional[str] = None) -> Tuple[List[int], List[int], np.ndarray]:
+    """
+    Split job indexes into the top_k most relevant (worth sending to Gemini) and
+    the rest. Also returns the local scores so callers can reuse them.
+    """
+    scores = local_scores(jobs, role, experience, resume_text)
+    order = np.argsort(-scores, kind="stable")
+    return order[:top_k].tolist(), order[top_k:].tolist(), scores
@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable
+from dotenv import load_dotenv
+from backend.services import codecs
+from backend.services.tracing import span
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path)
+logger = logging.getLogger(__name__)
+
+# off: call upstreams normally. record: call them and store every successful response.
+# replay: answer from the store only, never touching the network.
+UPSTREAM_REPLAY_MODE = os.getenv("UPSTREAM_REPLAY_MODE", "off").lower()
+UPSTREAM_REPLAY_DIR = os.getenv("UPSTREAM_REPLAY_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".replay"))
+# Replayed responses wait their recorded latency times this factor (0 serves them instantly)
+UPSTREAM_REPLAY_LATENCY_SCALE = float(os.getenv("UPSTREAM_REPLAY_LATENCY_SCALE", "1.0"))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+class ReplayMissError(Exception):
+    """Replay mode got a request that was never recorded."""
+
+def normalize_request(request: dict) -> str:
+    """
+    Canonical form of a request: keys sorted, string values whitespace-collapsed.
+    Indentation changes in a prompt or a re-ordered query string still hit the same recording.
+    """
+    def clean(value: Any) -> Any:
+        if isinstance(value, str):
+            return _WHITESPACE_RE.sub(" ", value).strip()
+        if isinstance(value, dict):
+            return {k: clean(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [clean(v) for v in value]
+        return value
+    return json.dumps(clean(request), sort_keys=True, separators=(",", ":"), default=str)
+
+class UpstreamRecorder:
+    """
+    Record/replay layer for upstream calls. Each response is stored as one file,
+    <dir>/<service>/<sha1 of normalized request>.bin, encoded with the cache codec
+    (msgpack + zstd when available), together with the request and its latency.
+    """
+
+    def __init__(self, mode: str = UPSTREAM_REPLAY_MODE, directory: str = UPSTREAM_REPLAY_DIR,
+                 latency_scale: float = UPSTREAM_REPLAY_LATENCY_SCALE):
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown UPSTREAM_REPLAY_MODE '{mode}', expected off, record or replay")
+        self.mode = mode
+        self.directory = directory
+        self.latency_scale = latency_scale
+        self.codec = codecs.get_codec("auto")
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _path(self, service: str, normalized: str) -> str:
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, service, f"{digest}.bin")
+
+    def _load(self, path: str) -> dict:
+        with open(path, "rb") as f:
+            return codecs.decode(f.read())
+
+    def _store(self, path: str, entry: dict) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so concurrent replays never read a half-written file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(codecs.encode(entry, self.codec))
+        os.replace(tmp, path)
+
+    async def call(self, service: str, request: dict, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return fn()'s (JSON-serializable) result, recording or replaying it depending on the mode."""
+        if self.mode == "off":
+            return await fn()
+
+        normalized = normalize_request(request)
+        path = self._path(service, normalized)
+
+        if self.mode == "replay":
+            # Its own span name, so traces never pass a replay off as a real upstream call
+            with span(f"{service}.replay"):
+                try:
+                    entry = await asyncio.to_thread(self._load, path)
+                except FileNotFoundError:
+                    self.misses += 1
+                    raise ReplayMissError(f"No {service} recording for {normalized[:200]}")
+                self.hits += 1
+                if self.latency_scale > 0:
+                    await asyncio.sleep(entry["latency"] * self.latency_scale)
+                return entry["response"]
+
+        start = time.perf_counter()
+        response = await fn()
+        entry = {"request": normalized, "latency": time.perf_counter() - start, "response": response, "recorded_at": time.time()}
+        try:
+            await asyncio.to_thread(self._store, path, entry)
+            self.recorded += 1
+        except Exception as e:
+            logger.error(f"Could not record {service} response: {str(e)}")
+        return response
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+upstream_recorder = UpstreamRecorder()
@@ -2,9 +2,14 @@ import os
 import logging
 import httpx
 import asyncio
-from typing import List
+import hashlib
+from typing import AsyncIterator, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from backend.services.http_client import http_client
+from backend.services.cache import cache_service
+from backend.services.metrics import track_upstream
+from backend.services.replay import ReplayMissError, upstream_recorder
 
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path)
@@ -12,9 +17,20 @@ logger = logging.getLogger(__name__)
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 
-def parse_posted_time(time_text: str) -> datetime:
-    """Converts strings like '2 days ago', '3 hours ago' to datetime."""
-    now = datetime.now(timezone.utc)
+# Per-query response cache; entries never outlive the current day in India
+SERPAPI_CACHE_TTL = int(os.getenv("SERPAPI_CACHE_TTL", "7200"))
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Pagination: each query pages until its share of SERPAPI_TARGET_JOBS is reached
+# (0 keeps the old single-page behaviour), never beyond SERPAPI_MAX_PAGES
+SERPAPI_TARGET_JOBS = int(os.getenv("SERPAPI_TARGET_JOBS", "0"))
+SERPAPI_MAX_PAGES = int(os.getenv("SERPAPI_MAX_PAGES", "3"))
+
+SERP_JOB_FIELDS = ("job_id", "title", "company_name", "location", "description", "via", "detected_extensions", "share_link")
+
+def parse_posted_time(time_text: str, now: datetime = None) -> datetime:
+    """Converts strings like '2 days ago', '3 hours ago' to datetime (relative to `now`)."""
+    now = now or datetime.now(timezone.utc)
     if not time_text:
         return now
         
@@ -48,8 +64,60 @@ def filter_recent_jobs(jobs: List[dict]) -> List[dict]:
             
     return recent
 
-async def _fetch_serpapi_jobs(client: httpx.AsyncClient, query: str) -> List[dict]:
-    """Internal function to call SerpAPI with retries."""
+def _serp_cache_key(query: str, page_token: Optional[str]) -> str:
+    normalized = " ".join(query.lower().split())
+    digest = hashlib.sha1(f"{normalized}|{page_token or ''}".encode("utf-8")).hexdigest()
+    return f"serp:{digest}"
+
+def _serp_cache_ttl() -> int:
+    """
+    Results are filtered with date_posted:today, so a cached page is only
+    meaningful until the Indian calendar day rolls over (capped by SERPAPI_CACHE_TTL).
+    """
+    now = datetime.now(IST)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(60, min(SERPAPI_CACHE_TTL, int((midnight - now).total_seconds())))
+
+def _slim_serp_job(job: dict) -> dict:
+    """Keep only the SerpAPI fields we parse, so cached pages stay small."""
+    slim = {k: job.get(k) for k in SERP_JOB_FIELDS if k in job}
+    if job.get("apply_options"):
+        slim["apply_options"] = job["apply_options"][:1]
+    return slim
+
+def _parse_serpapi_job(job: dict, now: datetime) -> dict:
+    source = "Unknown"
+    if "via" in job and job["via"]:
+        source = job["via"].replace("via ", "").strip()
+        
+    posted_time = parse_posted_time(job.get("detected_extensions", {}).get("posted_at", ""), now)
+    
+    ext_id = job.get("job_id")
+    if not ext_id:
+        ext_id = f"fallback_{hash(job.get('title', ''))}_{hash(job.get('company_name', ''))}"
+    
+    return {
+        "external_id": ext_id,
+        "title": job.get("title"),
+        "company": job.get("company_name"),
+        "location": job.get("location"),
+        "description": job.get("description", ""),
+        "source": source,
+        "apply_url": job.get("apply_options", [{}])[0].get("link", "") if job.get("apply_options") else job.get("share_link", ""), 
+        "salary_range": job.get("detected_extensions", {}).get("salary", ""),
+        "posted_at": posted_time
+    }
+
+async def _fetch_serpapi_page(client: httpx.AsyncClient, query: str, page_token: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one results page (cached per query + page token). Returns (jobs, next_page_token)."""
+    cache_key = _serp_cache_key(query, page_token)
+    cached = await cache_service.get_value(cache_key)
+    if cached is not None:
+        # Relative 'posted_at' texts are resolved against the original fetch time
+        fetched_at = datetime.fromtimestamp(cached["fetched_at"], timezone.utc)
+        jobs = [_parse_serpapi_job(job, fetched_at) for job in cached["jobs_results"]]
+        return jobs, cached.get("next_page_token")
+
     url = "https://serpapi.com/search"
     params = {
         "engine": "google_jobs",
@@ -60,39 +128,42 @@ async def _fetch_serpapi_jobs(client: httpx.AsyncClient, query: str) -> List[dic
         "gl": "in",
         "api_key": SERPAPI_KEY
     }
+    if page_token:
+        params["next_page_token"] = page_token
     
-    parsed_jobs = []
+    async def request() -> dict:
+        # Timed here rather than around the recorder, so replayed answers are not counted as SerpAPI calls
+        with track_upstream("serpapi", "search"):
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            return response.json()
+
     for attempt in range(2):
         try:
-            response = await client.get(url, params=params, timeout=15.0)
-            response.raise_for_status()
-            data = response.json()
+            # The API key is left out of the recording key (and off the disk)
+            data = await upstream_recorder.call("serpapi", {k: v for k, v in params.items() if k != "api_key"}, request)
             
-            jobs = data.get("jobs_results", [])
-            for job in jobs:
-                source = "Unknown"
-                if "via" in job and job["via"]:
-                    source = job["via"].replace("via ", "").strip()
-                    
-                posted_time = parse_posted_time(job.get("detected_extensions", {}).get("posted_at", ""))
-                
-                ext_id = job.get("job_id")
-                if not ext_id:
-                    ext_id = f"fallback_{hash(job.get('title', ''))}_{hash(job.get('company_name', ''))}"
-                
-                parsed_jobs.append({
-                    "external_id": ext_id,
-                    "title": job.get("title"),
-                    "company": job.get("company_name"),
-                    "location": job.get("location"),
-                    "description": job.get("description", ""),
-                    "source": source,
-                    "apply_url": job.get("apply_options", [{}])[0].get("link", "") if job.get("apply_options") else job.get("share_link", ""), 
-                    "salary_range": job.get("detected_extensions", {}).get("salary", ""),
-                    "posted_at": posted_time
-                })
-            break # Success, exit retry loop
+            if data.get("error"):
+                # SerpAPI reports no results, bad keys and exhausted quota as 200 + "error"
+                logger.warning(f"SerpAPI returned an error for '{query}': {data['error']}")
+                return [], None
+
+            now = datetime.now(timezone.utc)
+            raw_jobs = [_slim_serp_job(job) for job in data.get("jobs_results", [])]
+            next_token = data.get("serpapi_pagination", {}).get("next_page_token")
+            # An empty page is not worth pinning for the rest of the day, the next search asks again
+            if raw_jobs:
+                await cache_service.set_value(cache_key, {
+                    "fetched_at": now.timestamp(),
+                    "jobs_results": raw_jobs,
+                    "next_page_token": next_token
+                }, _serp_cache_ttl())
+            return [_parse_serpapi_job(job, now) for job in raw_jobs], next_token
             
+        except ReplayMissError as e:
+            # Retrying cannot make a recording appear
+            logger.error(f"SerpAPI {str(e)}")
+            return [], None
         except httpx.HTTPError as e:
             logger.error(f"SerpAPI HTTP Error (attempt {attempt+1}): {str(e)}")
             await asyncio.sleep(1)
@@ -100,57 +171,97 @@ async def _fetch_serpapi_jobs(client: httpx.AsyncClient, query: str) -> List[dic
             logger.error(f"SerpAPI Error (attempt {attempt+1}): {str(e)}")
             await asyncio.sleep(1)
             
+    return [], None
+
+async def iter_serpapi_pages(client: httpx.AsyncClient, query: str, max_pages: int = SERPAPI_MAX_PAGES) -> AsyncIterator[List[dict]]:
+    """Yield result pages lazily; the next page is only requested when the caller asks for it."""
+    page_token = None
+    for _ in range(max_pages):
+        jobs, page_token = await _fetch_serpapi_page(client, query, page_token)
+        yield jobs
+        if not jobs or not page_token:
+            break
+
+async def _fetch_serpapi_jobs(client: httpx.AsyncClient, query: str, target_count: int = 0) -> List[dict]:
+    """Internal function to call SerpAPI with retries. Pages until `target_count` jobs (one page by default)."""
+    parsed_jobs = []
+    async for page in iter_serpapi_pages(client, query):
+        parsed_jobs.extend(page)
+        if len(parsed_jobs) >= target_count:
+            break
     return parsed_jobs
 
-async def fetch_jobs(role: str, experience: int, queries: List[str] = None) -> List[dict]:
+async def stream_jobs(queries: List[str], client: httpx.AsyncClient = None,
+                      target_count: int = SERPAPI_TARGET_JOBS) -> AsyncIterator[List[dict]]:
+    """
+    Run the queries in parallel and yield each one's unique, recent jobs as soon as
+    that query returns, instead of waiting for the slowest one.
+    """
+    if not SERPAPI_KEY and not upstream_recorder.replaying:
+        logger.error("SERPAPI_KEY is not set")
+        return
+    client = client or http_client.get()
+    per_query_target = -(-target_count // len(queries)) if target_count else 0
+    tasks = [asyncio.create_task(_fetch_serpapi_jobs(client, q, per_query_target)) for q in queries]
+    seen_ids = set()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                res = await next_done
+            except Exception as e:
+                logger.error(f"Parallel fetch error: {e}")
+                continue
+            batch = []
+            for job in filter_recent_jobs(res):
+                if job["external_id"] not in seen_ids:
+                    seen_ids.add(job["external_id"])
+                    batch.append(job)
+            if batch:
+                yield batch
+    finally:
+        # Consumer stopped early (e.g. client disconnected): don't leave requests running
+        for task in tasks:
+            task.cancel()
+
+async def fetch_jobs(role: str, experience: int, queries: List[str] = None, client: httpx.AsyncClient = None,
+                     target_count: int = SERPAPI_TARGET_JOBS) -> List[dict]:
     """
     Fetch jobs from SerpAPI. Support for fallback queries or parallel queries.
+    Uses the app-wide pooled HTTP client unless one is passed in.
     """
-    if not SERPAPI_KEY:
+    if not SERPAPI_KEY and not upstream_recorder.replaying:
         logger.error("SERPAPI_KEY is not set")
         return []
         
-    async with httpx.AsyncClient() as client:
-        # If external optimized queries are provided (from Gemini Phase 4.2), run them in parallel
-        if queries and len(queries) > 0:
-            logger.info(f"Running parallel searches for optimized queries: {queries}")
-            tasks = [_fetch_serpapi_jobs(client, q) for q in queries]
-            results: List[List[dict]] = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            all_jobs = []
-            seen_ids = set()
-            for i, res in enumerate(results):
-                if isinstance(res, Exception):
-                    logger.error(f"Parallel fetch error for '{queries[i]}': {res}")
-                    continue
-                for job in res:
-                    if job["external_id"] not in seen_ids:
-                        seen_ids.add(job["external_id"])
-                        all_jobs.append(job)
-            
-            recent_jobs = filter_recent_jobs(all_jobs)
-            logger.info(f"Parallel fetch returned {len(recent_jobs)} unique recent jobs")
-            return recent_jobs
+    client = client or http_client.get()
+    # If external optimized queries are provided (from Gemini Phase 4.2), run them in parallel
+    if queries and len(queries) > 0:
+        logger.info(f"Running parallel searches for optimized queries: {queries}")
+        recent_jobs = []
+        async for batch in stream_jobs(queries, client=client, target_count=target_count):
+            recent_jobs.extend(batch)
+        logger.info(f"Parallel fetch returned {len(recent_jobs)} unique recent jobs")
+        return recent_jobs
 
-        # Otherwise, use Phase 8.2 sequential fallback logic
-        base_queries = [
-            f"{role} {experience} years experience jobs India",
-            f"{role} jobs India",
-            f"{role} hiring India 2024",
-            f"{role} job opening Bangalore Mumbai Delhi"
-        ]
-        
-        all_jobs = []
-        for q in base_queries:
-            logger.info(f"Trying SerpAPI query: {q}")
-            all_jobs = await _fetch_serpapi_jobs(client, q)
-            recent_jobs = filter_recent_jobs(all_jobs)
-            if len(recent_jobs) > 0:
-                logger.info(f"Query succeeded with {len(recent_jobs)} jobs.")
-                return recent_jobs
-                
-        # If all fail, try without experience
-        logger.info("All fallback queries failed, trying general query.")
-        all_jobs = await _fetch_serpapi_jobs(client, f"{role} jobs India")
+    # Otherwise, use Phase 8.2 sequential fallback logic
+    base_queries = [
+        f"{role} {experience} years experience jobs India",
+        f"{role} jobs India",
+        f"{role} hiring India 2024",
+        f"{role} job opening Bangalore Mumbai Delhi"
+    ]
+    
+    all_jobs = []
+    for q in base_queries:
+        logger.info(f"Trying SerpAPI query: {q}")
+        all_jobs = await _fetch_serpapi_jobs(client, q, target_count)
         recent_jobs = filter_recent_jobs(all_jobs)
-        return recent_jobs
+        if len(recent_jobs) > 0:
+            logger.info(f"Query succeeded with {len(recent_jobs)} jobs.")
+            return recent_jobs
+            
+    # If all fail, try without experience
+    logger.info("All fallback queries failed, trying general query.")
+    all_jobs = await _fetch_serpapi_jobs(client, f"{role} jobs India", target_count)
+    recent_jobs = filter_recent_jobs(all_jobs)
+    return recent_jobs
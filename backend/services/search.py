@@ -0,0 +1,318 @@
+import os
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, List, Optional
+from backend.database import db
+from backend.services.scraper import fetch_jobs, stream_jobs
+from backend.services.cache import cache_service
+from backend.services.gemini import rank_jobs, get_search_tips, optimize_search_queries, DEFAULT_TIPS
+from backend.services.relevance import LOCAL_SCORE_MIN, LOCAL_SCORE_MAX, local_rank
+from backend.services.pipeline import Stage, run_dag
+from backend.services.ingest import upsert_jobs
+from backend.services.dedup import collapse_near_duplicates
+from backend.services.singleflight import search_flight
+from backend.services.ratelimit import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from backend.services.tracing import detached_task
+
+logger = logging.getLogger(__name__)
+
+# Local search answers from the jobs table; below this many matches we go to SerpAPI
+SEARCH_LOCAL_MIN_RESULTS = int(os.getenv("SEARCH_LOCAL_MIN_RESULTS", "15"))
+SEARCH_LOCAL_LIMIT = int(os.getenv("SEARCH_LOCAL_LIMIT", "60"))
+SEARCH_LOCAL_MAX_AGE_HOURS = int(os.getenv("SEARCH_LOCAL_MAX_AGE_HOURS", "24"))
+# Listings stored for a search within this many years of the requested experience count as matches
+SEARCH_LOCAL_EXPERIENCE_SPAN = int(os.getenv("SEARCH_LOCAL_EXPERIENCE_SPAN", "2"))
+
+# Per-stage timeouts (seconds) for the search pipeline; every stage except the DB write has a fallback
+STAGE_TIMEOUTS = {
+    "queries": float(os.getenv("STAGE_TIMEOUT_QUERIES", "15")),
+    "fetch": float(os.getenv("STAGE_TIMEOUT_FETCH", "40")),
+    "store": float(os.getenv("STAGE_TIMEOUT_STORE", "15")),
+    "rank": float(os.getenv("STAGE_TIMEOUT_RANK", "60")),
+    "tips": float(os.getenv("STAGE_TIMEOUT_TIPS", "20")),
+    "cache": float(os.getenv("STAGE_TIMEOUT_CACHE", "5")),
+}
+# Longest a pipeline run can take (its slowest dependency chain), which is how long
+# single-flight followers on other workers are willing to wait for it
+SEARCH_PIPELINE_DEADLINE = sum(STAGE_TIMEOUTS[s] for s in ("queries", "fetch", "store", "rank", "cache"))
+
+# ts_rank (title-weighted via the generated search_vector) decayed by listing age in days.
+# experience_min is the experience of the search that stored the listing; NULL ones match any.
+LOCAL_SEARCH_SQL = """
+SELECT id, external_id, title, company, location, description, source, apply_url, salary_range, posted_at, alternate_apply_urls,
+       ts_rank(search_vector, q) / (1 + EXTRACT(EPOCH FROM (now() - posted_at))::float8 / 86400) AS rank
+FROM jobs, plainto_tsquery('english', $1) AS q
+WHERE search_vector @@ q
+  AND posted_at >= now() - make_interval(hours => $2)
+  AND (experience_min IS NULL OR experience_min BETWEEN $4::int - $5::int AND $4::int + $5::int)
+ORDER BY rank DESC
+LIMIT $3
+"""
+
+# Strong references to fire-and-forget refresh tasks so they are not garbage collected
+_background_tasks = set()
+
+async def peek_cached_search(role: str, experience: int) -> Optional[dict]:
+    """Return a cached search response if one exists, without generating anything."""
+    cached = await cache_service.get_cached_search(role, experience)
+    if cached is None:
+        return None
+    return {
+        "jobs": cached["jobs"],
+        "ai_tips": cached["tips"] or DEFAULT_TIPS,
+        "from_cache": True,
+        "total": len(cached["jobs"])
+    }
+
+def schedule_refresh(role: str, experience: int) -> None:
+    """Refresh a stale search in the background, at most once per REFRESH_COOLDOWN."""
+    _spawn(_refresh(role, experience))
+
+async def _refresh(role: str, experience: int) -> None:
+    if not await cache_service.claim_refresh(role, experience):
+        return
+    await search_flight.do(
+        cache_service.search_key(role, experience),
+        lambda: run_search_pipeline(role, experience, priority=PRIORITY_BACKGROUND),
+        wait_timeout=SEARCH_PIPELINE_DEADLINE
+    )
+
+def _spawn(coro) -> None:
+    task = detached_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def search_local_jobs(role: str, experience: int, limit: int = SEARCH_LOCAL_LIMIT) -> List[dict]:
+    """Recent jobs from our own table matching the role and experience, best first, scored on the local scale."""
+    async with db.acquire() as conn:
+        rows = await conn.fetch(LOCAL_SEARCH_SQL, role, SEARCH_LOCAL_MAX_AGE_HOURS, limit, experience, SEARCH_LOCAL_EXPERIENCE_SPAN)
+    if not rows:
+        return []
+
+    top = float(rows[0]["rank"]) or 1.0
+    jobs = []
+    for row in rows:
+        job = dict(row)
+        rank = float(job.pop("rank"))
+        job["id"] = str(job["id"])
+        job["alternate_apply_urls"] = json.loads(job["alternate_apply_urls"] or "[]")
+        job["ai_score"] = int(round(LOCAL_SCORE_MIN + (LOCAL_SCORE_MAX - LOCAL_SCORE_MIN) * rank / top))
+        job["ai_reason"] = "Matched from recent listings"
+        job["ai_ranked"] = False
+        if job.get("posted_at"):
+            job["posted_at"] = job["posted_at"].isoformat()
+        jobs.append(job)
+    return jobs
+
+async def run_local_search(role: str, experience: int, min_results: int = SEARCH_LOCAL_MIN_RESULTS) -> Optional[dict]:
+    """
+    Answer a search from the jobs table when it has at least `min_results` recent
+    matches, otherwise return None so the caller falls back to SerpAPI.
+
+    The answer is deliberately not written to the search cache: that key is shared
+    with mode=remote and means "SerpAPI results ranked by Gemini", so a cached local
+    answer would hide the full pipeline for a whole TTL. Local search is a single
+    indexed query and picks up newly stored listings on every call.
+    """
+    try:
+        jobs = await search_local_jobs(role, experience)
+    except Exception as e:
+        logger.error(f"Local search error: {str(e)}")
+        return None
+    if len(jobs) < min_results:
+        logger.info(f"Local search found {len(jobs)} jobs for '{role}', falling back to SerpAPI")
+        return None
+
+    # Tips are not worth a Gemini round trip here: serve cached ones or defaults and fill the cache behind us
+    ai_tips = await cache_service.get_cached_tips(role, experience)
+    if ai_tips is None:
+        ai_tips = DEFAULT_TIPS
+        _spawn(_cache_tips(role, experience))
+
+    return {
+        "jobs": jobs,
+        "ai_tips": ai_tips,
+        "from_cache": False,
+        "source": "local",
+        "total": len(jobs)
+    }
+
+async def _cache_tips(role: str, experience: int) -> None:
+    tips = await get_search_tips(role, experience, priority=PRIORITY_BACKGROUND)
+    if tips is not DEFAULT_TIPS:
+        await cache_service.cache_tips(role, experience, tips)
+
+async def run_search_pipeline(role: str, experience: int, priority: int = PRIORITY_INTERACTIVE,
+                              emit: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Optimize queries, fetch, upsert, rank and cache one (role, experience) search.
+    Stages run as a dependency graph: tips start at t=0 alongside query optimization
+    and are cancelled if the fetch comes back empty; jobs and tips are cached in one write.
+    With `emit`, stream_search's `jobs`, `scores` and `tips` events are passed to it as
+    the stages produce them.
+    """
+    async def optimize(r):
+        return await optimize_search_queries(role, experience, priority=priority)
+
+    async def fetch(r):
+        if emit is None:
+            return await fetch_jobs(role, experience, queries=r["queries"])
+        # Every query's jobs go out as soon as that query returns
+        new_jobs = []
+        async for batch in stream_jobs(r["queries"]):
+            new_jobs.extend(batch)
+            emit({"event": "jobs", "jobs": _serialize_jobs(batch), "from_cache": False})
+        return new_jobs
+
+    async def store(r):
+        if not r["fetch"]:
+            return []
+        # Syndicated copies (LinkedIn / Indeed / Glassdoor ...) collapse into one job with alternate links
+        new_jobs = collapse_near_duplicates(r["fetch"])
+        # The pipeline may outlive the request that started it, so it takes its own connection
+        async with db.acquire() as conn:
+            return await upsert_jobs(conn, new_jobs, experience)
+
+    async def rank(r):
+        ranked_jobs = await rank_jobs(r["store"], role, experience, priority=priority)
+        return _serialize_jobs(ranked_jobs)
+
+    def rank_fallback(r):
+        return _serialize_jobs(local_rank(r["store"], role, experience))
+
+    async def tips(r):
+        return await get_search_tips(role, experience, priority=priority)
+
+    async def cache(r):
+        if not r["rank"]:
+            return
+        # Default tips are a fallback, not worth caching: readers fetch real ones when tips are missing
+        if r["tips"] is DEFAULT_TIPS:
+            await cache_service.cache_jobs(role, experience, r["rank"])
+        else:
+            await cache_service.cache_search(role, experience, r["rank"], r["tips"])
+
+    def publish(name, r):
+        if name == "rank" and r["rank"]:
+            emit(_scores_event(r["rank"]))
+        if name in ("rank", "tips") and "rank" in r and "tips" in r:
+            emit({"event": "tips", "ai_tips": r["tips"] if r["rank"] else []})
+
+    results = await run_dag([
+        Stage("queries", optimize, timeout=STAGE_TIMEOUTS["queries"],
+              fallback=[f"{role} jobs India", f"{role} hiring India"]),
+        Stage("fetch", fetch, deps=["queries"], timeout=STAGE_TIMEOUTS["fetch"], fallback=[]),
+        Stage("store", store, deps=["fetch"], timeout=STAGE_TIMEOUTS["store"]),
+        Stage("rank", rank, deps=["store"], timeout=STAGE_TIMEOUTS["rank"], fallback=rank_fallback),
+        # Tips are only shown next to results, so an empty fetch makes them moot
+        Stage("tips", tips, timeout=STAGE_TIMEOUTS["tips"], fallback=DEFAULT_TIPS,
+              cancel_if=lambda r: r.get("fetch") == []),
+        Stage("cache", cache, deps=["rank", "tips"], timeout=STAGE_TIMEOUTS["cache"], fallback=None),
+    ], on_done=publish if emit is not None else None)
+
+    ranked_jobs = results["rank"]
+    return {
+        "jobs": ranked_jobs,
+        "ai_tips": results["tips"] if ranked_jobs else [],
+        "from_cache": False,
+        "total": len(ranked_jobs)
+    }
+
+def _serialize_jobs(jobs: List[dict]) -> List[dict]:
+    out = []
+    for job in jobs:
+        job = dict(job)
+        if hasattr(job.get("posted_at"), "isoformat"):
+            job["posted_at"] = job["posted_at"].isoformat()
+        out.append(job)
+    return out
+
+def _scores_event(ranked_jobs: List[dict]) -> dict:
+    # external_id links these to the raw jobs already sent; raw jobs missing here were collapsed as duplicates
+    return {
+        "event": "scores",
+        "scores": [
+            {
+                "external_id": j["external_id"],
+                "id": j["id"],
+                "ai_score": j.get("ai_score"),
+                "ai_reason": j.get("ai_reason"),
+                "ai_ranked": j.get("ai_ranked", True),
+                "alternate_apply_urls": j.get("alternate_apply_urls", [])
+            }
+            for j in ranked_jobs
+        ]
+    }
+
+def _result_events(result: dict) -> List[dict]:
+    """A finished search response as stream events (for answers that were not produced incrementally)."""
+    extra = {"source": result["source"]} if "source" in result else {}
+    return [
+        {"event": "jobs", "jobs": result["jobs"], "from_cache": result["from_cache"], **extra},
+        {"event": "tips", "ai_tips": result["ai_tips"]},
+        {"event": "done", "from_cache": result["from_cache"], "total": result["total"], **extra},
+    ]
+
+async def stream_search(role: str, experience: int, mode: str = "auto",
+                        priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[dict]:
+    """
+    Same answer as /search, but yields events as results become available:
+    `jobs` for every SerpAPI query that returns, `scores` once ranking is done,
+    `tips` and finally `done`. Cache, local search and `mode` behave as in /search.
+    """
+    cached = await cache_service.get_cached_search(role, experience)
+    if cached is not None:
+        if cached["stale"]:
+            schedule_refresh(role, experience)
+        yield {"event": "jobs", "jobs": cached["jobs"], "from_cache": True}
+        yield {"event": "tips", "ai_tips": cached["tips"] or await get_search_tips(role, experience, priority=priority)}
+        yield {"event": "done", "from_cache": True, "total": len(cached["jobs"])}
+        return
+
+    if mode != "remote":
+        local = await run_local_search(role, experience, min_results=0 if mode == "local" else SEARCH_LOCAL_MIN_RESULTS)
+        if local is None and mode == "local":
+            local = {"jobs": [], "ai_tips": DEFAULT_TIPS, "from_cache": False, "source": "local", "total": 0}
+        if local is not None:
+            for event in _result_events(local):
+                yield event
+            return
+
+    # The streaming run is registered with search_flight like a /search pipeline, so
+    # concurrent searches for the key (streamed or not) share it. If another run was
+    # already in flight, this stream gets its finished result in one go instead.
+    events: asyncio.Queue = asyncio.Queue()
+    leading = False
+
+    async def pipeline():
+        nonlocal leading
+        leading = True
+        return await run_search_pipeline(role, experience, priority, emit=events.put_nowait)
+
+    flight = asyncio.ensure_future(search_flight.do(
+        cache_service.search_key(role, experience),
+        pipeline,
+        peek=lambda: peek_cached_search(role, experience),
+        wait_timeout=SEARCH_PIPELINE_DEADLINE
+    ))
+    try:
+        while not flight.done():
+            next_event = asyncio.ensure_future(events.get())
+            await asyncio.wait({next_event, flight}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield next_event.result()
+            else:
+                next_event.cancel()
+        while not events.empty():
+            yield events.get_nowait()
+
+        result = flight.result()
+        if leading:
+            yield {"event": "done", "from_cache": False, "total": result["total"]}
+        else:
+            for event in _result_events(result):
+                yield event
+    finally:
+        # The shared run itself is shielded by search_flight and keeps going for other callers
+        flight.cancel()
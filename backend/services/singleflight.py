@@ -0,0 +1,139 @@
+import os
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+from dotenv import load_dotenv
+from backend.services.cache import cache_service
+from backend.services.tracing import Trace, current_trace, detached_task
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path)
+logger = logging.getLogger(__name__)
+
+# Cross-worker coalescing through a Redis lock is opt-in; in-process coalescing is always on
+SINGLEFLIGHT_REDIS_LOCK = os.getenv("SINGLEFLIGHT_REDIS_LOCK", "false").lower() == "true"
+# The leader re-extends its lock every third of the TTL while it runs, so the TTL only
+# bounds how long a crashed worker can block others, not how long a run may take
+SINGLEFLIGHT_LOCK_TTL = int(os.getenv("SINGLEFLIGHT_LOCK_TTL", "30"))
+# Default cap on waiting for another worker; callers pass their own run's deadline
+SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT", "150"))
+SINGLEFLIGHT_POLL_INTERVAL = 0.25
+
+# Only delete the lock if we still own it (it may have expired and been re-taken)
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Push the lock's expiry out, again only while we still own it
+EXTEND_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Concurrent callers for the same key
+    await the leader's result instead of starting their own call.
+    """
+
+    def __init__(self, redis_client=None, use_redis_lock: bool = SINGLEFLIGHT_REDIS_LOCK):
+        self.redis = redis_client
+        self.use_redis_lock = use_redis_lock and redis_client is not None
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        peek: Optional[Callable[[], Awaitable[Any]]] = None,
+        wait_timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Return the result of `fn()` for `key`, sharing it with concurrent callers.
+        `peek` is used by cross-worker waiters to pick up a result published by
+        another worker (e.g. a cache read); it should return None when nothing is ready.
+        `wait_timeout` caps that wait (SINGLEFLIGHT_WAIT_TIMEOUT by default) and should
+        cover the longest a run of `fn` can take.
+        """
+        task = self._inflight.get(key)
+        own_trace, run_trace = None, None
+        if task is None:
+            # The run outlives any one caller, so it never records into a request's trace
+            # directly: a traced leader gets the run's spans merged in once it finishes
+            own_trace = current_trace()
+            run_trace = Trace() if own_trace is not None else None
+            task = detached_task(self._lead(key, fn, peek, wait_timeout or SINGLEFLIGHT_WAIT_TIMEOUT), run_trace)
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        try:
+            # shield so a disconnecting caller does not cancel the work other callers wait on
+            return await asyncio.shield(task)
+        finally:
+            if run_trace is not None and task.done():
+                own_trace.merge(run_trace)
+
+    async def _lead(self, key: str, fn, peek, wait_timeout: float) -> Any:
+        if not self.use_redis_lock:
+            return await fn()
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_timeout
+        waited = False
+
+        while True:
+            try:
+                acquired = await self.redis.set(lock_key, token, nx=True, ex=SINGLEFLIGHT_LOCK_TTL)
+            except Exception as e:
+                logger.error(f"Single-flight lock error for {key}: {str(e)}")
+                return await fn()
+
+            if acquired:
+                heartbeat = asyncio.create_task(self._heartbeat(lock_key, token))
+                try:
+                    # The previous holder may have published and released between our polls
+                    if waited and peek is not None:
+                        result = await peek()
+                        if result is not None:
+                            return result
+                    return await fn()
+                finally:
+                    heartbeat.cancel()
+                    await self._release(lock_key, token)
+            waited = True
+
+            # Another worker is running the pipeline, wait for it to publish
+            if peek is not None:
+                result = await peek()
+                if result is not None:
+                    return result
+
+            if loop.time() >= deadline:
+                logger.warning(f"Single-flight wait timed out for {key}, running locally")
+                return await fn()
+            await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+
+    async def _heartbeat(self, lock_key: str, token: str) -> None:
+        while True:
+            await asyncio.sleep(SINGLEFLIGHT_LOCK_TTL / 3)
+            try:
+                if not await self.redis.eval(EXTEND_LOCK_SCRIPT, 1, lock_key, token, SINGLEFLIGHT_LOCK_TTL):
+                    logger.warning(f"Single-flight lock {lock_key} was lost while running")
+                    return
+            except Exception as e:
+                logger.error(f"Single-flight lock extend error for {lock_key}: {str(e)}")
+
+    async def _release(self, lock_key: str, token: str) -> None:
+        try:
+            await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.error(f"Single-flight unlock error for {lock_key}: {str(e)}")
+
+search_flight = SingleFlight(cache_service.redis)
@@ -0,0 +1,139 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path)
+
+# Fraction of searches that are traced; untraced requests pay one ContextVar lookup per span
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# Durations kept per span name for the rolling summary
+TRACE_SUMMARY_WINDOW = int(os.getenv("TRACE_SUMMARY_WINDOW", "500"))
+
+class Trace:
+    """
+    Spans recorded for one request. Tasks spawned by the request share it through the
+    ContextVar, except detached ones (see detached_task) that may outlive the request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []  # (name, offset_ms, duration_ms)
+
+    def add(self, name: str, start: float, end: float) -> None:
+        self.spans.append((name, (start - self.started) * 1000, (end - start) * 1000))
+        stage_stats.observe(name, (end - start) * 1000)
+
+    def merge(self, other: "Trace") -> None:
+        """Append another trace's spans, shifted onto this trace's timeline (already counted in stage_stats)."""
+        shift = (other.started - self.started) * 1000
+        self.spans.extend((name, offset + shift, duration) for name, offset, duration in other.spans)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, one entry per span name (durations of repeated spans are summed)."""
+        totals: Dict[str, List[float]] = {}
+        for name, _, duration in self.spans:
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += duration
+            entry[1] += 1
+        parts = []
+        for name, (duration, count) in totals.items():
+            metric = name.replace(".", "_")
+            parts.append(f'{metric};dur={duration:.1f}' + (f';desc="x{count}"' if count > 1 else ""))
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def as_dict(self) -> dict:
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "spans": [
+                {"name": name, "start_ms": round(offset, 1), "duration_ms": round(duration, 1)}
+                for name, offset, duration in sorted(self.spans, key=lambda s: s[1])
+            ]
+        }
+
+class StageStats:
+    """Rolling window of recent span durations per name, summarized as percentiles."""
+
+    def __init__(self, window: int = TRACE_SUMMARY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, name: str, duration_ms: float) -> None:
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.window)
+        samples.append(duration_ms)
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for name, samples in sorted(self._samples.items()):
+            ordered = sorted(samples)
+            pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+            result[name] = {"count": len(ordered), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(ordered[-1], 1)}
+        return result
+
+stage_stats = StageStats()
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, self.start, time.perf_counter())
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name: str):
+    """Time a block as `name` in the current trace; a shared no-op when the request is not traced."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def detached_task(coro, trace: Optional[Trace] = None) -> asyncio.Task:
+    """
+    create_task for work that can outlive the current request (background refreshes,
+    shared single-flight runs, long-lived workers). The task does not inherit the
+    request's trace; it records into `trace` instead, or nothing.
+    """
+    token = _current_trace.set(trace)
+    try:
+        return asyncio.create_task(coro)
+    finally:
+        _current_trace.reset(token)
+
+def start_trace(force: bool = False) -> Optional[Trace]:
+    """Begin tracing the current request if it is sampled (or `force`d). Returns the trace or None."""
+    if not force and random.random() >= TRACE_SAMPLE_RATE:
+        return None
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
@@ -1,7 +1,7 @@
 import asyncio, json, os
 from dotenv import load_dotenv
 import google.generativeai as genai
-from services.gemini import rank_jobs
+from backend.services.gemini import rank_jobs
 
 load_dotenv(".env")
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
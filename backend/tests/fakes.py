@@ -0,0 +1,99 @@
+"""In-process stand-ins shared by the tests and the load test (backend/loadtest.py)."""
+import time
+from typing import Dict
+
+class InMemoryRedis:
+    """The subset of redis.asyncio the app uses, with expiry, for runs without a Redis server."""
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}  # key -> (value, expires_at or None)
+
+    def _get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry[0]
+
+    def _put(self, key, value, ex=None):
+        self._data[key] = (value, time.monotonic() + ex if ex else None)
+
+    @staticmethod
+    def _bytes(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode("utf-8")
+
+    async def ping(self):
+        return True
+
+    async def get(self, key):
+        return self._get(key)
+
+    async def mget(self, keys):
+        return [self._get(k) for k in keys]
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and self._get(key) is not None:
+            return None
+        self._put(key, self._bytes(value), ex)
+        return True
+
+    async def setex(self, key, ttl, value):
+        self._put(key, self._bytes(value), ttl)
+        return True
+
+    async def delete(self, *keys):
+        return sum(1 for k in keys if self._data.pop(k, None) is not None)
+
+    async def expire(self, key, ttl):
+        value = self._get(key)
+        if value is None:
+            return False
+        self._put(key, value, ttl)
+        return True
+
+    async def zincrby(self, key, amount, member):
+        zset = self._get(key)
+        if zset is None:
+            zset = {}
+            self._put(key, zset)
+        member = self._bytes(member)
+        zset[member] = zset.get(member, 0) + amount
+        return zset[member]
+
+    async def zrevrange(self, key, start, end, withscores=False):
+        zset = self._get(key) or {}
+        items = sorted(zset.items(), key=lambda kv: kv[1], reverse=True)[start:end + 1]
+        return items if withscores else [m for m, _ in items]
+
+    async def eval(self, script, numkeys, *args):
+        # Only the single-flight lock scripts are used: both act on KEYS[1] only if it
+        # holds ARGV[1], then either extend it by ARGV[2] seconds or delete it
+        key, token = args[0], self._bytes(args[numkeys])
+        if self._get(key) != token:
+            return 0
+        if "expire" in script:
+            return await self.expire(key, float(args[numkeys + 1]))
+        return await self.delete(key)
+
+    def pipeline(self, transaction=True):
+        return _InMemoryPipeline(self)
+
+class _InMemoryPipeline:
+    def __init__(self, redis: InMemoryRedis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+        def queue(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        calls, self.calls = self.calls, []
+        return [await method(*args, **kwargs) for method, args, kwargs in calls]
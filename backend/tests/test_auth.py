@@ -0,0 +1,14 @@
+import asyncio
+from fastapi.security import HTTPAuthorizationCredentials
+from backend.auth import jwt_handler
+from backend.auth.jwt_handler import create_access_token, get_current_user, verify_token
+
+def test_token_carries_profile_claims():
+    payload = verify_token(create_access_token("u1", "a@b.c", "Ada", "https://img/ada.png"))
+    assert (payload["user_id"], payload["name"], payload["avatar_url"]) == ("u1", "Ada", "https://img/ada.png")
+
+def test_trusted_fresh_token_resolves_full_user_without_db(monkeypatch):
+    monkeypatch.setattr(jwt_handler, "AUTH_TRUST_CLAIMS_SECONDS", 60)
+    token = create_access_token("u2", "a@b.c", "Ada", None)
+    user = asyncio.run(get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)))
+    assert user == {"id": "u2", "email": "a@b.c", "name": "Ada", "avatar_url": None}
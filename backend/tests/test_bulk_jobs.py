@@ -0,0 +1,56 @@
+import uuid
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.database import get_db
+from backend.auth.jwt_handler import get_current_user
+
+JOB = "6f1c2a4e-8b5d-4c3e-9a7f-0d2b1e3c4f5a"
+MISSING = "0b9e8d7c-6a5f-4e3d-8c2b-1a0f9e8d7c6b"
+
+class FakeDb:
+    """Answers BULK_STATUS_SQL as if the user has applied to JOB only."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def fetch(self, sql, user_id, job_ids, statuses):
+        self.calls.append((job_ids, statuses))
+        return [{"job_id": j} for j in job_ids if j == uuid.UUID(JOB)]
+
+def _client(fake_db):
+    async def override_db():
+        yield fake_db
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = lambda: {"id": "user-1"}
+    return TestClient(app)
+
+def _results(response):
+    assert response.status_code == 200
+    return [(r["job_id"], r["result"]) for r in response.json()["results"]]
+
+def teardown_function():
+    app.dependency_overrides.clear()
+
+def test_mixed_case_duplicates_share_one_outcome():
+    fake_db = FakeDb()
+    response = _client(fake_db).patch("/api/v1/jobs/apply/bulk/status", json={"updates": [
+        {"job_id": JOB, "status": "inprocess"},
+        {"job_id": JOB.upper(), "status": "hired"},
+        {"job_id": MISSING, "status": "rejected"},
+        {"job_id": "not-a-uuid", "status": "hired"},
+    ]})
+    assert _results(response) == [
+        (JOB, "updated"), (JOB.upper(), "updated"), (MISSING, "not_found"), ("not-a-uuid", "invalid_id")
+    ]
+    # One row per job, carrying the last status sent for it
+    job_ids, statuses = fake_db.calls[0]
+    assert dict(zip(job_ids, statuses)) == {uuid.UUID(JOB): "hired", uuid.UUID(MISSING): "rejected"}
+
+def test_invalid_status_after_a_valid_one_for_another_spelling():
+    fake_db = FakeDb()
+    response = _client(fake_db).patch("/api/v1/jobs/apply/bulk/status", json={"updates": [
+        {"job_id": JOB, "status": "inprocess"},
+        {"job_id": JOB.upper(), "status": "hired?"},
+    ]})
+    assert _results(response) == [(JOB, "invalid_status"), (JOB.upper(), "invalid_status")]
+    assert fake_db.calls == []
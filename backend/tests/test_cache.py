@@ -0,0 +1,62 @@
+import asyncio
+import time
+from backend.tests.fakes import InMemoryRedis
+from backend.services import cache as cache_module
+from backend.services.cache import CacheService, LocalLRU
+
+def test_local_reads_are_private_copies():
+    cache = CacheService()
+    cache.redis = None
+    jobs = [{"id": "1", "title": "Engineer"}]
+
+    async def scenario():
+        await cache.cache_jobs("react developer", 2, jobs)
+        first = await cache.get_cached_jobs("react developer", 2)
+        first[0]["ai_score"] = 99
+        first.append({"id": "2"})
+        return await cache.get_cached_jobs("react developer", 2)
+
+    assert asyncio.run(scenario()) == [{"id": "1", "title": "Engineer"}]
+
+def test_local_lru_is_bounded_by_encoded_bytes():
+    lru = LocalLRU(max_bytes=100, max_entries=10)
+    lru.set("a", b"x" * 60, time.time())
+    lru.set("b", b"y" * 60, time.time())
+    assert lru.get("a") is None
+    assert lru.get("b")[0] == b"y" * 60
+    lru.set("huge", b"z" * 101, time.time())
+    assert lru.get("huge") is None
+
+def test_local_copy_rechecks_redis_after_local_ttl(monkeypatch):
+    cache = CacheService()
+    cache.redis = InMemoryRedis()
+
+    async def scenario():
+        await cache.cache_jobs("python developer", 1, [{"id": "old"}])
+        # Another worker refreshes the entry in Redis
+        other = CacheService()
+        other.redis = cache.redis
+        await other.cache_jobs("python developer", 1, [{"id": "new"}])
+
+        before = await cache.get_cached_jobs("python developer", 1)
+        monkeypatch.setattr(cache_module, "LOCAL_CACHE_TTL", 0)
+        after = await cache.get_cached_jobs("python developer", 1)
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before == [{"id": "old"}]
+    assert after == [{"id": "new"}]
+
+def test_refresh_marker_allows_one_refresh_per_cooldown():
+    async def scenario(cache):
+        first = await cache.claim_refresh("Go Developer", 3)
+        again = await cache.claim_refresh("go  developer", 3)
+        other = await cache.claim_refresh("go developer", 4)
+        return first, again, other
+
+    with_redis = CacheService()
+    with_redis.redis = InMemoryRedis()
+    without_redis = CacheService()
+    without_redis.redis = None
+    assert asyncio.run(scenario(with_redis)) == (True, False, True)
+    assert asyncio.run(scenario(without_redis)) == (True, False, True)
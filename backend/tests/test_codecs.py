@@ -0,0 +1,32 @@
+import json
+import pytest
+from backend.services import codecs
+from backend.bench_cache_codec import make_jobs
+
+@pytest.mark.parametrize("name", sorted(codecs.available_codecs()))
+def test_round_trip(name):
+    codec = codecs.get_codec(name)
+    jobs = make_jobs(30)
+    raw = codecs.encode(jobs, codec)
+    assert raw[:2] == codecs.MAGIC
+    assert raw[3] == codec.id
+    assert codecs.decode(raw) == jobs
+
+def test_legacy_headerless_json_still_decodes():
+    jobs = make_jobs(3)
+    assert codecs.decode(json.dumps(jobs).encode("utf-8")) == jobs
+    assert codecs.decode(json.dumps(jobs)) == jobs
+
+def test_unknown_version_is_rejected():
+    raw = codecs.encode({"a": 1}, codecs.get_codec("json"))
+    with pytest.raises(ValueError):
+        codecs.decode(raw[:2] + bytes([99]) + raw[3:])
+
+def test_codec_base_is_abstract():
+    with pytest.raises(TypeError):
+        codecs.Codec()
+
+def test_compressed_codecs_are_smaller_than_json():
+    jobs = make_jobs(50)
+    plain = len(codecs.encode(jobs, codecs.get_codec("json")))
+    assert len(codecs.encode(jobs, codecs.get_codec("auto"))) < plain / 2
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from backend import database
+from backend.database import PoolTimeoutError, detect_pgbouncer, get_db
+
+@pytest.mark.parametrize("dsn, expected", [
+    ("postgresql://u:p@db.example.com:5432/app", False),
+    ("postgresql://u:p@aws-0-region.pooler.supabase.com:6543/postgres", True),
+    ("postgresql://u:p@pgbouncer.internal:5432/app", True),
+    ("postgresql://u:p@db.example.com:5432/app?pgbouncer=true&sslmode=require", True),
+    ("postgresql://u:p@db.example.com:6543/app?pgbouncer=false", False),
+])
+def test_detect_pgbouncer(monkeypatch, dsn, expected):
+    monkeypatch.setattr(database, "DB_PGBOUNCER", "auto")
+    detected, clean = detect_pgbouncer(dsn)
+    assert detected is expected
+    assert "pgbouncer=" not in clean
+    assert ("sslmode=require" in clean) == ("sslmode=require" in dsn)
+
+def test_detect_pgbouncer_can_be_forced(monkeypatch):
+    monkeypatch.setattr(database, "DB_PGBOUNCER", "false")
+    assert detect_pgbouncer("postgresql://u:p@host:6543/app")[0] is False
+
+class FakePool:
+    def __init__(self, timeout=False):
+        self.timeout = timeout
+        self.released = []
+
+    def get_idle_size(self):
+        return 0
+
+    def get_size(self):
+        return 1
+
+    async def acquire(self, timeout=None):
+        if self.timeout:
+            raise asyncio.TimeoutError()
+        return "connection"
+
+    async def release(self, connection):
+        self.released.append(connection)
+
+def test_get_db_maps_acquire_timeout_to_503(monkeypatch):
+    monkeypatch.setattr(database.db, "pool", FakePool(timeout=True))
+
+    async def scenario():
+        with pytest.raises(HTTPException) as exc:
+            await get_db().__anext__()
+        return exc.value.status_code
+
+    assert asyncio.run(scenario()) == 503
+
+def test_get_db_leaves_errors_raised_by_the_route_alone(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(database.db, "pool", pool)
+
+    async def scenario():
+        dependency = get_db()
+        assert await dependency.__anext__() == "connection"
+        # e.g. the route itself waited on another pool acquire and timed out
+        with pytest.raises(PoolTimeoutError):
+            await dependency.athrow(PoolTimeoutError("inner"))
+
+    asyncio.run(scenario())
+    assert pool.released == ["connection"]
@@ -0,0 +1,53 @@
+import random
+import numpy as np
+from backend.services.dedup import (
+    _PRIME, _shingles, collapse_near_duplicates, find_duplicate_clusters, minhash_signature
+)
+
+WORDS = [f"word{i}" for i in range(400)]
+
+def _job(title, company, description, url=None, source=None):
+    return {"title": title, "company": company, "description": description, "apply_url": url, "source": source}
+
+def _exact_jaccard(a, b):
+    sa, sb = set(_shingles(a).tolist()), set(_shingles(b).tolist())
+    return len(sa & sb) / len(sa | sb)
+
+def test_signature_values_stay_below_the_prime():
+    sig = minhash_signature(_job("Python Developer", "Acme", " ".join(WORDS)))
+    assert sig.dtype == np.uint64
+    assert int(sig.max()) < int(_PRIME)
+
+def test_estimated_jaccard_tracks_exact_jaccard():
+    rng = random.Random(7)
+    errors = []
+    for keep in (1.0, 0.9, 0.75, 0.5, 0.3, 0.1):
+        base = [rng.choice(WORDS) for _ in range(150)]
+        changed = [w if rng.random() < keep else rng.choice(WORDS) for w in base]
+        a = _job("Backend Engineer", "Acme", " ".join(base))
+        b = _job("Backend Engineer", "Acme", " ".join(changed))
+        estimated = float(np.mean(minhash_signature(a) == minhash_signature(b)))
+        errors.append(abs(estimated - _exact_jaccard(a, b)))
+    # 64 permutations: standard error is at most 1/16 per pair
+    assert max(errors) < 0.2
+    assert sum(errors) / len(errors) < 0.1
+
+def test_syndicated_copies_collapse_with_alternate_links():
+    description = " ".join(WORDS[:120])
+    jobs = [
+        _job("Python Developer", "Acme", description, "https://linkedin/1", "LinkedIn"),
+        _job("Python Developer", "Acme", description + " apply now", "https://indeed/1", "Indeed"),
+        _job("Data Analyst", "Other Co", " ".join(WORDS[200:320]), "https://indeed/2", "Indeed"),
+    ]
+    collapsed = collapse_near_duplicates(jobs)
+    assert len(collapsed) == 2
+    assert collapsed[0]["alternate_apply_urls"] == [{"source": "LinkedIn", "apply_url": "https://linkedin/1"}]
+
+def test_shared_company_boilerplate_does_not_collapse_different_roles():
+    boilerplate = " ".join(WORDS[:150])
+    jobs = [
+        _job("Python Developer", "Acme", boilerplate + " django apis"),
+        _job("QA Engineer", "Acme", boilerplate + " selenium testing"),
+    ]
+    assert find_duplicate_clusters(jobs, title_threshold=0.0) == [[0, 1]]
+    assert find_duplicate_clusters(jobs) == [[0], [1]]
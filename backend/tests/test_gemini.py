@@ -0,0 +1,59 @@
+import json
+from backend.services import gemini
+from backend.services.gemini import _build_chunks, _calibrate
+from backend.services.ratelimit import estimate_tokens
+
+def _slim(i: int, desc_len: int = 200) -> dict:
+    return {"id": str(i), "title": f"Engineer {i}", "company": "Acme", "desc": "x" * desc_len}
+
+def test_build_chunks_respects_the_token_budget(monkeypatch):
+    jobs = [_slim(i) for i in range(10)]
+    per_job = estimate_tokens(json.dumps(jobs[0]))
+    monkeypatch.setattr(gemini, "RANK_CHUNK_TOKENS", per_job * 3)
+    monkeypatch.setattr(gemini, "RANK_CHUNK_MAX_JOBS", 100)
+
+    chunks = _build_chunks(jobs)
+    assert [len(c) for c in chunks] == [3, 3, 3, 1]
+    assert [j for c in chunks for j in c] == jobs
+
+def test_build_chunks_caps_jobs_per_chunk(monkeypatch):
+    monkeypatch.setattr(gemini, "RANK_CHUNK_TOKENS", 10 ** 6)
+    monkeypatch.setattr(gemini, "RANK_CHUNK_MAX_JOBS", 4)
+    assert [len(c) for c in _build_chunks([_slim(i, 10) for i in range(9)])] == [4, 4, 1]
+
+def test_build_chunks_gives_an_oversized_job_its_own_chunk(monkeypatch):
+    monkeypatch.setattr(gemini, "RANK_CHUNK_TOKENS", 100)
+    monkeypatch.setattr(gemini, "RANK_CHUNK_MAX_JOBS", 30)
+    small, huge = _slim(1, 10), _slim(2, 2000)
+    assert _build_chunks([small, huge, _slim(3, 10)]) == [[small], [huge], [_slim(3, 10)]]
+    assert _build_chunks([huge]) == [[huge]]
+
+def _scores(**scores) -> dict:
+    return {k: {"score": float(v), "reason": k} for k, v in scores.items()}
+
+def test_calibrate_shifts_chunks_by_the_mean_anchor_offset():
+    reference = _scores(a1=80, a2=60, x=50)
+    # This chunk scored the anchors 10 and 20 lower, so it is shifted up by 15
+    other = _scores(a1=70, a2=40, y=55)
+    _calibrate([reference, other], ["a1", "a2"])
+    assert other["y"]["score"] == 70
+    assert other["a1"] is reference["a1"] and other["a2"] is reference["a2"]
+    assert reference == _scores(a1=80, a2=60, x=50)
+
+def test_calibrate_clamps_to_the_score_range():
+    reference = _scores(a=90)
+    high, low = _scores(a=40, y=80), _scores(a=100, z=5)
+    _calibrate([reference, high, low], ["a"])
+    assert high["y"]["score"] == 100.0
+    assert low["z"]["score"] == 0.0
+
+def test_calibrate_skips_chunks_missing_the_anchor_scores():
+    reference = _scores(a=90)
+    no_anchor = _scores(y=40)
+    _calibrate([reference, no_anchor, None], ["a"])
+    assert no_anchor == _scores(y=40)
+
+    # Without a reference chunk there is nothing to line up with
+    orphan = _scores(a=10, y=40)
+    _calibrate([None, orphan], ["a"])
+    assert orphan == _scores(a=10, y=40)
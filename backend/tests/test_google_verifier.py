@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from backend.auth import google_verifier as module
+from backend.auth.google_verifier import GoogleTokenVerifier
+
+def _verifier(monkeypatch, fetches):
+    verifier = GoogleTokenVerifier(min_refresh_interval=60)
+
+    async def fake_fetch():
+        verifier._fetched_at = module.time.monotonic()
+        fetches.append(True)
+        verifier._certs = {"known": "cert"}
+        verifier._expires_at = module.time.monotonic() + 3600
+
+    monkeypatch.setattr(verifier, "_fetch_certs", fake_fetch)
+    return verifier
+
+def test_unknown_kids_refetch_at_most_once_per_interval(monkeypatch):
+    fetches = []
+    verifier = _verifier(monkeypatch, fetches)
+    kids = iter(["forged-1", "forged-2", "forged-3"])
+    monkeypatch.setattr(module.google_jwt, "decode_header", lambda token: {"kid": next(kids)})
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await verifier.verify("token", "client-id")
+
+    asyncio.run(scenario())
+    # One fetch to load the certs; the forced refresh is suppressed inside the interval
+    assert len(fetches) == 1
+
+def test_forced_refresh_allowed_after_the_interval(monkeypatch):
+    fetches = []
+    verifier = _verifier(monkeypatch, fetches)
+    monkeypatch.setattr(module.google_jwt, "decode_header", lambda token: {"kid": "rotated"})
+
+    async def scenario():
+        await verifier._get_certs("known")
+        verifier._fetched_at -= 61
+        with pytest.raises(ValueError):
+            await verifier.verify("token", "client-id")
+
+    asyncio.run(scenario())
+    assert len(fetches) == 2
+
+def test_token_without_kid_is_rejected_without_fetching(monkeypatch):
+    fetches = []
+    verifier = _verifier(monkeypatch, fetches)
+    monkeypatch.setattr(module.google_jwt, "decode_header", lambda token: {})
+    with pytest.raises(ValueError):
+        asyncio.run(verifier.verify("token", "client-id"))
+    assert fetches == []
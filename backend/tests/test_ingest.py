@@ -0,0 +1,56 @@
+import asyncio
+import json
+import uuid
+from backend.services.ingest import UPSERT_JOBS_SQL, upsert_jobs
+
+class FakeConnection:
+    """Answers UPSERT_JOBS_SQL like Postgres would, returning rows in reverse to check the reordering."""
+
+    def __init__(self, existing_links=None):
+        self.calls = []
+        self.existing_links = existing_links or {}
+
+    async def fetch(self, sql, *params):
+        self.calls.append((sql, params))
+        external_ids, titles = params[0], params[1]
+        links = params[9]
+        rows = []
+        for ext, title, link in zip(external_ids, titles, links):
+            # Same rule as the ON CONFLICT clause: an empty list keeps the links already stored
+            stored = link if json.loads(link) else self.existing_links.get(ext, "[]")
+            rows.append({"id": uuid.uuid5(uuid.NAMESPACE_URL, ext), "external_id": ext, "title": title,
+                         "alternate_apply_urls": stored})
+        return list(reversed(rows))
+
+def _job(ext, title=None, links=None):
+    return {"external_id": ext, "title": title or ext, "company": "Acme", "alternate_apply_urls": links}
+
+def test_duplicates_are_dropped_and_rows_sorted_by_external_id():
+    conn = FakeConnection()
+    jobs = [_job("c"), _job("a", "first a"), _job("b"), _job("a", "second a")]
+    result = asyncio.run(upsert_jobs(conn, jobs, 3))
+
+    sql, params = conn.calls[0]
+    assert sql == UPSERT_JOBS_SQL
+    assert params[0] == ["a", "b", "c"]
+    assert params[1] == ["first a", "b", "c"]
+    assert params[-1] == 3
+    # Stored rows come back in the scraper's order, one per external_id, ids as strings
+    assert [r["external_id"] for r in result] == ["c", "a", "b"]
+    assert result[1]["title"] == "first a"
+    assert all(isinstance(r["id"], str) for r in result)
+
+def test_alternate_links_are_sent_as_json_and_decoded():
+    conn = FakeConnection(existing_links={"b": json.dumps([{"source": "Indeed", "apply_url": "https://indeed/b"}])})
+    links = [{"source": "LinkedIn", "apply_url": "https://linkedin/a"}]
+    result = asyncio.run(upsert_jobs(conn, [_job("a", links=links), _job("b")], 1))
+
+    _, params = conn.calls[0]
+    assert params[9] == [json.dumps(links), "[]"]
+    assert result[0]["alternate_apply_urls"] == links
+    assert result[1]["alternate_apply_urls"] == [{"source": "Indeed", "apply_url": "https://indeed/b"}]
+
+def test_empty_input_skips_the_database():
+    conn = FakeConnection()
+    assert asyncio.run(upsert_jobs(conn, [], 2)) == []
+    assert conn.calls == []
@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.database import get_db
+from backend.auth.jwt_handler import get_current_user
+from backend.routes.jobs import _etag_matches, _job_etag
+
+NOW = datetime(2026, 1, 15, 12, 0, tzinfo=timezone.utc)
+
+def _row(**overrides):
+    row = {
+        "id": uuid.UUID("6f1c2a4e-8b5d-4c3e-9a7f-0d2b1e3c4f5a"), "title": "Engineer", "alternate_apply_urls": None,
+        "fetched_at": NOW, "status": "applied", "applied_at": NOW, "applied_updated_at": NOW, "saved_at": None
+    }
+    row.update(overrides)
+    return row
+
+class FakeDb:
+    def __init__(self, row):
+        self.row = row
+
+    async def fetchrow(self, sql, job_id, user_id):
+        return self.row
+
+def test_etag_changes_with_tracker_state():
+    base = _job_etag(_row(), "user-1")
+    assert _job_etag(_row(), "user-1") == base
+    assert _job_etag(_row(applied_updated_at=NOW + timedelta(seconds=1)), "user-1") != base
+    assert _job_etag(_row(saved_at=NOW), "user-1") != base
+    assert _job_etag(_row(), "user-2") != base
+
+def test_if_none_match_uses_weak_comparison():
+    etag = _job_etag(_row(), "user-1")
+    assert _etag_matches(etag, etag)
+    assert _etag_matches(f"W/{etag}", etag)
+    assert _etag_matches(f'"other", W/{etag}', etag)
+    assert _etag_matches(" * ", etag)
+    assert not _etag_matches('"other", W/"another"', etag)
+    assert not _etag_matches(None, etag)
+    assert not _etag_matches("", etag)
+
+def teardown_function():
+    app.dependency_overrides.clear()
+
+def test_matching_if_none_match_gets_304_with_the_same_etag():
+    app.dependency_overrides[get_db] = lambda: FakeDb(_row())
+    app.dependency_overrides[get_current_user] = lambda: {"id": "user-1"}
+    client = TestClient(app)
+    first = client.get("/api/v1/jobs/6f1c2a4e-8b5d-4c3e-9a7f-0d2b1e3c4f5a")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.json()["user_data"]["status"] == "applied"
+
+    again = client.get("/api/v1/jobs/6f1c2a4e-8b5d-4c3e-9a7f-0d2b1e3c4f5a", headers={"If-None-Match": f"W/{etag}"})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.content == b""
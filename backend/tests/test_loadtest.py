@@ -0,0 +1,16 @@
+from types import SimpleNamespace
+import pytest
+import backend.services.cache  # noqa: F401  (any backend module counts as already imported)
+from backend.loadtest import DEFAULT_MIX, _configure_env, _parse_mix
+
+def test_configure_env_refuses_to_run_after_backend_imports():
+    with pytest.raises(RuntimeError, match="imported before the load-test settings"):
+        _configure_env(SimpleNamespace(database_url="postgresql://unused", redis_url=None, gemini_rpm=1))
+
+def test_parse_mix_overrides_and_drops_zero_weights():
+    mix = _parse_mix("search_hot=50,login=0")
+    assert mix["search_hot"] == 50
+    assert "login" not in mix
+    assert set(mix) == set(DEFAULT_MIX) - {"login"}
+    with pytest.raises(SystemExit):
+        _parse_mix("unknown=1")
@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from backend import main
+from backend.services.metrics import Counter, Gauge, Histogram, Metric, Registry, track_upstream, upstream_errors
+
+def test_metric_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("jobtrackr_x", "help")
+
+def test_counter_renders_labels_and_unlabelled_zero():
+    requests = Counter("jobtrackr_requests_total", "Requests", ("route",))
+    requests.inc("/search")
+    requests.inc("/search", amount=2)
+    assert requests.value("/search") == 3
+    assert 'jobtrackr_requests_total{route="/search"} 3' in requests.render()
+    assert Counter("jobtrackr_errors_total", "Errors").render().endswith("jobtrackr_errors_total 0")
+
+def test_histogram_buckets_are_cumulative():
+    latency = Histogram("jobtrackr_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+    lines = latency.render().splitlines()
+    assert 'jobtrackr_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'jobtrackr_latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'jobtrackr_latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "jobtrackr_latency_seconds_count 3" in lines
+
+def test_registry_reads_callback_gauges_at_render_time():
+    registry = Registry()
+    size = {"n": 1}
+    registry.register(Gauge("jobtrackr_pool_size", "Pool size", ("state",), fn=lambda: {("idle",): size["n"]}))
+    size["n"] = 4
+    assert 'jobtrackr_pool_size{state="idle"} 4' in registry.render()
+
+def test_track_upstream_counts_errors_but_not_cancellations():
+    def run(exc):
+        with pytest.raises(type(exc)):
+            with track_upstream("serpapi", "test"):
+                raise exc
+
+    before = upstream_errors.value("serpapi", "test")
+    run(RuntimeError("HTTP 500"))
+    run(asyncio.CancelledError())
+    assert upstream_errors.value("serpapi", "test") == before + 1
+
+def test_metrics_endpoint_is_closed_without_a_token(monkeypatch):
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 401
+    monkeypatch.setattr(main, "METRICS_PUBLIC", True)
+    assert client.get("/metrics").status_code == 200
+
+    monkeypatch.setattr(main, "METRICS_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
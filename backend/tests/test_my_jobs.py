@@ -0,0 +1,77 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.database import get_db
+from backend.auth.jwt_handler import get_current_user
+from backend.routes.jobs import MY_JOBS_COLUMNS, _decode_cursor, _encode_cursor
+
+NOW = datetime(2026, 1, 15, 12, 0, tzinfo=timezone.utc)
+SUMMARY = {"applied_count": 3, "inprocess_count": 0, "rejected_count": 0, "hired_count": 0, "saved_count": 2}
+
+class FakeDb:
+    """Answers MY_JOBS_SQL from a list of jobs, cutting pages on (activity_at, id) like the keyset query."""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.calls = []
+
+    async def fetch(self, sql, user_id, filter, cursor_at, cursor_id, limit):
+        self.calls.append((cursor_at, cursor_id, limit))
+        ordered = sorted(self.jobs, key=lambda j: (j["activity_at"], j["id"]), reverse=True)
+        if cursor_at is not None:
+            ordered = [j for j in ordered if (j["activity_at"], j["id"]) < (cursor_at, cursor_id)]
+        page = [dict(j, **SUMMARY) for j in ordered[:limit]]
+        # The summary row comes back even when the page is empty
+        return page or [dict({c: None for c in MY_JOBS_COLUMNS}, activity_at=None, **SUMMARY)]
+
+def _job(activity_at):
+    job = {c: None for c in MY_JOBS_COLUMNS}
+    job.update(id=uuid.uuid4(), title="Engineer", status="applied", activity_at=activity_at)
+    return job
+
+def _client(fake_db):
+    async def override_db():
+        yield fake_db
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = lambda: {"id": "user-1"}
+    return TestClient(app)
+
+def teardown_function():
+    app.dependency_overrides.clear()
+
+def test_cursor_round_trips():
+    job_id = uuid.uuid4()
+    assert _decode_cursor(_encode_cursor(NOW, job_id)) == (NOW, job_id)
+
+def test_malformed_cursor_is_a_client_error():
+    client = _client(FakeDb([]))
+    for cursor in ("not-base64!", _encode_cursor(NOW, "not-a-uuid"), "bm8tc2VwYXJhdG9y"):
+        response = client.get("/api/v1/jobs/my-jobs", params={"cursor": cursor})
+        assert response.status_code == 400
+
+def test_pages_walk_ties_on_activity_at_without_gaps_or_repeats():
+    # Bulk updates stamp many jobs with the same activity time
+    jobs = [_job(NOW) for _ in range(4)] + [_job(NOW - timedelta(hours=1))]
+    client = _client(FakeDb(jobs))
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v1/jobs/my-jobs", params=params).json()
+        seen.extend(j["id"] for j in body["jobs"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    expected = sorted(jobs, key=lambda j: (j["activity_at"], j["id"]), reverse=True)
+    assert seen == [str(j["id"]) for j in expected]
+
+def test_limit_zero_returns_only_the_summary():
+    fake_db = FakeDb([_job(NOW)])
+    body = _client(fake_db).get("/api/v1/jobs/my-jobs", params={"limit": 0}).json()
+    assert body == {
+        "jobs": [],
+        "summary": {"applied": 3, "inprocess": 0, "rejected": 0, "hired": 0, "saved": 2},
+        "next_cursor": None
+    }
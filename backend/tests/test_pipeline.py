@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from backend.services.pipeline import Stage, run_dag
+
+def _value(v, delay=0.0):
+    async def fn(r):
+        await asyncio.sleep(delay)
+        return v
+    return fn
+
+def test_independent_stages_overlap_and_see_their_deps():
+    # Each of a and b waits for the other to start, so they only finish if they run concurrently
+    async def scenario():
+        started = {"a": asyncio.Event(), "b": asyncio.Event()}
+
+        def meet(name, other, v):
+            async def fn(r):
+                started[name].set()
+                await started[other].wait()
+                return v
+            return fn
+
+        async def total(r):
+            return r["a"] + r["b"]
+
+        # The timeout only turns a sequential (deadlocked) run into a failure instead of a hang
+        return await asyncio.wait_for(run_dag([
+            Stage("a", meet("a", "b", 1)),
+            Stage("b", meet("b", "a", 2)),
+            Stage("sum", total, deps=["a", "b"]),
+        ]), timeout=5)
+
+    assert asyncio.run(scenario()) == {"a": 1, "b": 2, "sum": 3}
+
+def test_timeout_and_error_resolve_to_fallbacks():
+    async def boom(r):
+        raise RuntimeError("boom")
+
+    results = asyncio.run(run_dag([
+        Stage("slow", _value("late", 1.0), timeout=0.05, fallback="fallback"),
+        Stage("broken", boom, fallback=lambda r: "computed"),
+    ]))
+    assert results == {"slow": "fallback", "broken": "computed"}
+
+def test_error_without_fallback_cancels_the_rest():
+    cancelled = []
+
+    async def slow(r):
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def boom(r):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await run_dag([Stage("slow", slow), Stage("boom", boom)])
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert cancelled == [True]
+
+def test_cancel_if_abandons_a_running_stage():
+    cancelled = []
+
+    async def never(r):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        return await asyncio.wait_for(run_dag([
+            Stage("fetch", _value([])),
+            Stage("tips", never, fallback="default", cancel_if=lambda r: r.get("fetch") == []),
+            Stage("after", _value("ok"), deps=["tips"]),
+        ]), timeout=5)
+
+    assert asyncio.run(scenario()) == {"fetch": [], "tips": "default", "after": "ok"}
+    assert cancelled == [True]
+
+def test_on_done_sees_every_stage_including_fallbacks():
+    seen = []
+
+    async def boom(r):
+        raise RuntimeError("boom")
+
+    asyncio.run(run_dag([
+        Stage("fetch", _value([])),
+        Stage("rank", boom, deps=["fetch"], fallback="local"),
+        Stage("tips", _value(["tip"], 1.0), fallback="default", cancel_if=lambda r: r.get("fetch") == []),
+    ], on_done=lambda name, r: seen.append((name, r[name]))))
+    assert sorted(seen) == [("fetch", []), ("rank", "local"), ("tips", "default")]
+
+def test_cancel_if_needs_a_fallback():
+    with pytest.raises(ValueError):
+        Stage("tips", _value(1), cancel_if=lambda r: True)
+
+def test_unknown_dependency_and_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        asyncio.run(run_dag([Stage("a", _value(1), deps=["missing"])]))
+    with pytest.raises(ValueError):
+        asyncio.run(run_dag([Stage("a", _value(1), deps=["b"]), Stage("b", _value(2), deps=["a"])]))
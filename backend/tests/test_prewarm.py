@@ -0,0 +1,28 @@
+import asyncio
+from backend.services import prewarm
+from backend.services.cache import cache_service
+from backend.services.prewarm import SearchPopularity
+
+def test_member_matches_cache_key_normalization():
+    popularity = SearchPopularity()
+    role, _, experience = popularity._member("  Python   Developer ", 3).rpartition("|")
+    assert cache_service.search_key(role, int(experience)) == cache_service.search_key("python developer", 3)
+
+def test_full_buffer_flushes_early_instead_of_dropping_counts(monkeypatch):
+    monkeypatch.setattr(prewarm, "MAX_PENDING_KEYS", 4)
+    monkeypatch.setattr(cache_service, "redis", None)
+
+    async def scenario():
+        popularity = SearchPopularity()
+        popularity.record("python developer", 3)
+        popularity.record("python developer", 3)
+        for role in ("data analyst", "java engineer", "devops engineer"):
+            popularity.record(role, 2)
+        await popularity._flush_task
+        popularity.record("qa engineer", 1)
+        await popularity.flush()
+        return await popularity.top(10)
+
+    top = asyncio.run(scenario())
+    assert top[0] == ("python developer", 3)
+    assert len(top) == 5
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from backend.services.ratelimit import RateLimiter, TokenBucket, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+def test_token_bucket_refills_at_per_minute_rate():
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1) == 1.0
+    bucket.refill(bucket.updated + 0.5)
+    assert abs(bucket.level - 0.5) < 1e-9
+
+def test_concurrency_cap_is_respected():
+    limiter = RateLimiter(rpm=10000, tpm=10**9, max_concurrency=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.acquire(10):
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(*[call() for _ in range(8)])
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert limiter.in_flight == 0
+    assert limiter.stats()["granted"] == 8
+
+def test_interactive_callers_overtake_queued_background_work():
+    limiter = RateLimiter(rpm=10000, tpm=10**9, max_concurrency=1)
+    order = []
+
+    async def call(name, priority):
+        async with limiter.acquire(1, priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        first = asyncio.create_task(call("holder", PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        background = [asyncio.create_task(call(f"bg{i}", PRIORITY_BACKGROUND)) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("fg", PRIORITY_INTERACTIVE))
+        await asyncio.gather(first, interactive, *background)
+
+    asyncio.run(scenario())
+    assert order[:2] == ["holder", "fg"]
+
+def test_request_bucket_makes_callers_wait():
+    # 600 rpm = one request every 0.1s once the burst capacity is spent
+    limiter = RateLimiter(rpm=600, tpm=10**9, max_concurrency=10)
+    limiter.requests.take(limiter.requests.capacity)
+
+    async def scenario():
+        start = time.monotonic()
+        async with limiter.acquire(1):
+            pass
+        return time.monotonic() - start
+
+    waited = asyncio.run(scenario())
+    assert 0.05 < waited < 1.0
+    assert limiter.stats()["waited"] == 1
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = RateLimiter(rpm=10000, tpm=10**9, max_concurrency=1)
+
+    async def scenario():
+        async def hold():
+            async with limiter.acquire(1):
+                await asyncio.sleep(0.05)
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(limiter._acquire(1, PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+        async with limiter.acquire(1):
+            return limiter.in_flight
+
+    assert asyncio.run(scenario()) == 1
+    assert limiter.in_flight == 0
@@ -0,0 +1,40 @@
+from backend.services.relevance import (
+    LOCAL_SCORE_MAX, LOCAL_SCORE_MIN, bm25_scores, local_rank, local_scores, sort_ranked, tokenize
+)
+
+JOBS = [
+    {"title": "Python Developer", "description": "Build APIs in python and django"},
+    {"title": "Data Analyst", "description": "SQL dashboards, some python scripting"},
+    {"title": "Senior Java Engineer", "description": "Spring services"},
+]
+
+def test_tokenize_drops_stopwords_and_keeps_symbols():
+    assert tokenize("The C++ and C# developer for India") == ["c++", "c#", "developer"]
+
+def test_repeated_query_terms_weigh_more():
+    once = bm25_scores(JOBS, "python sql")
+    # Repeating "sql" must shift the balance towards the SQL job; a set-deduped query would not
+    weighted = bm25_scores(JOBS, "python sql sql sql")
+    assert weighted[1] / weighted[0] > once[1] / once[0]
+
+def test_local_scores_stay_in_band_and_rank_the_match_first():
+    scores = local_scores(JOBS, "python developer", 3)
+    assert scores.max() == LOCAL_SCORE_MAX
+    assert scores.min() >= LOCAL_SCORE_MIN
+    assert scores.argmax() == 0
+
+def test_seniority_penalty_demotes_senior_titles_for_juniors():
+    jobs = [{"title": "Senior Java Engineer", "description": ""}, {"title": "Java Engineer", "description": ""}]
+    ranked = local_rank([dict(j) for j in jobs], "java engineer", 1)
+    assert ranked[0]["title"] == "Java Engineer"
+
+def test_no_match_gets_the_floor_score():
+    assert list(local_scores(JOBS, "plumber", 3)) == [LOCAL_SCORE_MIN] * len(JOBS)
+
+def test_model_scored_jobs_sort_before_local_ones():
+    jobs = [
+        {"id": "local", "ai_score": 90, "ai_ranked": False},
+        {"id": "ai", "ai_score": 40, "ai_ranked": True},
+        {"id": "legacy", "ai_score": 60},
+    ]
+    assert [j["id"] for j in sort_ranked(jobs)] == ["legacy", "ai", "local"]
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from backend.services import scraper
+from backend.services.metrics import upstream_duration
+from backend.services.replay import ReplayMissError, UpstreamRecorder, normalize_request
+
+def test_normalize_request_ignores_key_order_and_whitespace():
+    a = normalize_request({"q": "python   developer\n", "hl": "en", "nested": {"prompt": "  rank\tthese "}})
+    b = normalize_request({"nested": {"prompt": "rank these"}, "hl": "en", "q": "python developer"})
+    assert a == b
+    assert normalize_request({"q": "python"}) != normalize_request({"q": "java"})
+
+def test_record_then_replay_round_trip(tmp_path):
+    calls = []
+
+    async def upstream():
+        calls.append(True)
+        return {"jobs_results": [{"title": "Python Developer"}]}
+
+    async def scenario():
+        recorder = UpstreamRecorder("record", str(tmp_path))
+        first = await recorder.call("serpapi", {"q": "python"}, upstream)
+        replayer = UpstreamRecorder("replay", str(tmp_path), latency_scale=0)
+        second = await replayer.call("serpapi", {"q": " python "}, upstream)
+        with pytest.raises(ReplayMissError):
+            await replayer.call("serpapi", {"q": "java"}, upstream)
+        return first, second, recorder.stats(), replayer.stats()
+
+    first, second, recorded, replayed = asyncio.run(scenario())
+    assert first == second
+    assert len(calls) == 1
+    assert recorded["recorded"] == 1
+    assert (replayed["hits"], replayed["misses"]) == (1, 1)
+
+def test_replay_miss_is_not_retried_or_counted_as_upstream(monkeypatch, tmp_path):
+    monkeypatch.setattr(scraper, "upstream_recorder", UpstreamRecorder("replay", str(tmp_path), latency_scale=0))
+
+    async def cache_miss(key):
+        return None
+
+    async def no_sleep(seconds):
+        raise AssertionError("a replay miss must not be retried")
+
+    monkeypatch.setattr(scraper.cache_service, "get_value", cache_miss)
+    monkeypatch.setattr(scraper.asyncio, "sleep", no_sleep)
+    def serpapi_calls():
+        series = upstream_duration._series.get(("serpapi", "search"))
+        return series[2] if series else 0
+
+    before = serpapi_calls()
+    assert asyncio.run(scraper._fetch_serpapi_page(None, "python developer")) == ([], None)
+    assert serpapi_calls() == before
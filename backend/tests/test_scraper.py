@@ -0,0 +1,35 @@
+import asyncio
+import httpx
+from backend.services import scraper
+from backend.services.cache import CacheService
+from backend.tests.fakes import InMemoryRedis
+
+def _fetch_twice(monkeypatch, body: dict):
+    cache = CacheService()
+    cache.redis = InMemoryRedis()
+    monkeypatch.setattr(scraper, "cache_service", cache)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json=body)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await scraper._fetch_serpapi_page(client, "python developer")
+            second = await scraper._fetch_serpapi_page(client, "python developer")
+            return first, second
+
+    return asyncio.run(scenario()), len(calls)
+
+def test_pages_with_jobs_are_cached(monkeypatch):
+    body = {"jobs_results": [{"job_id": "j1", "title": "Python Developer", "company_name": "Acme"}]}
+    (first, second), calls = _fetch_twice(monkeypatch, body)
+    assert calls == 1
+    assert [j["external_id"] for j in first[0]] == [j["external_id"] for j in second[0]] == ["j1"]
+
+def test_error_and_empty_pages_are_not_cached(monkeypatch):
+    for body in ({"error": "Google hasn't returned any results for this query."}, {"jobs_results": []}):
+        (first, second), calls = _fetch_twice(monkeypatch, body)
+        assert first == second == ([], None)
+        assert calls == 2
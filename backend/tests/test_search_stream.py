@@ -0,0 +1,104 @@
+import asyncio
+from contextlib import asynccontextmanager
+from backend.services import search
+
+async def _collect(stream):
+    return [event async for event in stream]
+
+def _patch_cache_miss(monkeypatch):
+    async def miss(role, experience):
+        return None
+    monkeypatch.setattr(search.cache_service, "get_cached_search", miss)
+
+def test_concurrent_streams_share_one_pipeline_run(monkeypatch):
+    _patch_cache_miss(monkeypatch)
+    runs = []
+
+    async def fake_pipeline(role, experience, priority, emit=None):
+        runs.append(role)
+        emit({"event": "jobs", "jobs": [{"external_id": "a"}], "from_cache": False})
+        await asyncio.sleep(0.05)
+        emit({"event": "tips", "ai_tips": ["tip"]})
+        return {"jobs": [{"id": "1"}], "ai_tips": ["tip"], "from_cache": False, "total": 1}
+
+    monkeypatch.setattr(search, "run_search_pipeline", fake_pipeline)
+
+    async def scenario():
+        first = asyncio.ensure_future(_collect(search.stream_search("python", 3, mode="remote")))
+        await asyncio.sleep(0.01)
+        second = await _collect(search.stream_search("python", 3, mode="remote"))
+        return await first, second
+
+    leader, follower = asyncio.run(scenario())
+    assert runs == ["python"]
+    assert [e["event"] for e in leader] == ["jobs", "tips", "done"]
+    assert leader[0]["jobs"] == [{"external_id": "a"}]
+    assert [e["event"] for e in follower] == ["jobs", "tips", "done"]
+    assert follower[0]["jobs"] == [{"id": "1"}]
+    assert follower[-1]["total"] == 1
+
+def test_local_mode_never_reaches_the_pipeline(monkeypatch):
+    _patch_cache_miss(monkeypatch)
+
+    async def no_local(role, experience, min_results):
+        return None
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("pipeline must not run in local mode")
+
+    monkeypatch.setattr(search, "run_local_search", no_local)
+    monkeypatch.setattr(search, "run_search_pipeline", fail)
+    events = asyncio.run(_collect(search.stream_search("python", 3, mode="local")))
+    assert events[1] == {"event": "tips", "ai_tips": search.DEFAULT_TIPS}
+    assert events[-1] == {"event": "done", "from_cache": False, "total": 0, "source": "local"}
+
+def test_streamed_run_uses_the_stage_fallbacks_and_cache_guard(monkeypatch):
+    _patch_cache_miss(monkeypatch)
+    cached = []
+
+    async def queries(role, experience, priority):
+        return ["python jobs"]
+
+    async def stream_jobs(queries):
+        yield [{"external_id": "a", "title": "Python Developer", "description": "python"}]
+        yield [{"external_id": "b", "title": "Java Developer", "description": "java"}]
+
+    @asynccontextmanager
+    async def acquire():
+        yield None
+
+    async def upsert(conn, jobs, experience):
+        return [dict(j, id=f"id-{j['external_id']}") for j in jobs]
+
+    async def rank_down(*args, **kwargs):
+        raise RuntimeError("Gemini is down")
+
+    async def default_tips(role, experience, priority):
+        return search.DEFAULT_TIPS
+
+    async def cache_jobs(role, experience, jobs):
+        cached.append(("jobs", len(jobs)))
+
+    async def cache_search(role, experience, jobs, tips):
+        cached.append(("search", len(jobs)))
+
+    monkeypatch.setattr(search, "optimize_search_queries", queries)
+    monkeypatch.setattr(search, "stream_jobs", stream_jobs)
+    monkeypatch.setattr(search, "collapse_near_duplicates", lambda jobs: jobs)
+    monkeypatch.setattr(search.db, "acquire", acquire)
+    monkeypatch.setattr(search, "upsert_jobs", upsert)
+    monkeypatch.setattr(search, "rank_jobs", rank_down)
+    monkeypatch.setattr(search, "get_search_tips", default_tips)
+    monkeypatch.setattr(search.cache_service, "cache_jobs", cache_jobs)
+    monkeypatch.setattr(search.cache_service, "cache_search", cache_search)
+
+    events = asyncio.run(_collect(search.stream_search("python developer", 3, mode="remote")))
+    assert [e["event"] for e in events] == ["jobs", "jobs", "scores", "tips", "done"]
+    # Ranking failed, so the scores are the local keyword fallback
+    scores = events[2]["scores"]
+    assert scores[0]["external_id"] == "a"
+    assert all(not s["ai_ranked"] for s in scores)
+    assert events[3]["ai_tips"] == search.DEFAULT_TIPS
+    assert events[-1]["total"] == 2
+    # Default tips are never written to the cache
+    assert cached == [("jobs", 2)]
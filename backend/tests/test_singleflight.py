@@ -0,0 +1,46 @@
+import asyncio
+from backend.tests.fakes import InMemoryRedis
+from backend.services import singleflight as singleflight_module
+from backend.services.singleflight import SingleFlight
+
+def test_leader_keeps_its_lock_while_running_past_the_ttl(monkeypatch):
+    monkeypatch.setattr(singleflight_module, "SINGLEFLIGHT_LOCK_TTL", 0.3)
+    redis = InMemoryRedis()
+    flight = SingleFlight(redis, use_redis_lock=True)
+    held = []
+
+    async def work():
+        for _ in range(4):
+            await asyncio.sleep(0.2)
+            held.append(await redis.get("lock:key") is not None)
+        return "result"
+
+    assert asyncio.run(flight.do("key", work)) == "result"
+    assert held == [True] * 4
+    assert asyncio.run(redis.get("lock:key")) is None
+
+def test_follower_picks_up_a_result_published_before_it_takes_the_lock(monkeypatch):
+    monkeypatch.setattr(singleflight_module, "SINGLEFLIGHT_POLL_INTERVAL", 0.01)
+    redis = InMemoryRedis()
+    flight = SingleFlight(redis, use_redis_lock=True)
+    published = []
+    runs = []
+
+    async def peek():
+        # Publishing and unlocking land between two polls, as with a leader on another worker
+        if not published:
+            published.append(True)
+            await redis.delete("lock:key")
+            return None
+        return "published"
+
+    async def work():
+        runs.append(True)
+        return "recomputed"
+
+    async def scenario():
+        await redis.set("lock:key", "other-worker", nx=True, ex=30)
+        return await flight.do("key", work, peek=peek, wait_timeout=5)
+
+    assert asyncio.run(scenario()) == "published"
+    assert runs == []
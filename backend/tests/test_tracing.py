@@ -0,0 +1,39 @@
+import asyncio
+from backend.services.singleflight import SingleFlight
+from backend.services.tracing import current_trace, detached_task, span, start_trace
+
+def test_detached_tasks_do_not_inherit_the_request_trace():
+    async def seen_trace():
+        return current_trace()
+
+    async def scenario():
+        trace = start_trace(force=True)
+        return trace, await asyncio.create_task(seen_trace()), await detached_task(seen_trace())
+
+    trace, inherited, detached = asyncio.run(scenario())
+    assert inherited is trace
+    assert detached is None
+
+def test_single_flight_merges_run_spans_into_the_leader_only():
+    flight = SingleFlight()
+
+    async def work():
+        with span("fetch"):
+            await asyncio.sleep(0.02)
+        return "result"
+
+    async def caller():
+        trace = start_trace(force=True)
+        result = await flight.do("key", work)
+        return trace, result
+
+    async def scenario():
+        leader = asyncio.ensure_future(caller())
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(caller())
+        return await leader, await follower
+
+    (leader_trace, r1), (follower_trace, r2) = asyncio.run(scenario())
+    assert r1 == r2 == "result"
+    assert [name for name, _, _ in leader_trace.spans] == ["fetch"]
+    assert follower_trace.spans == []
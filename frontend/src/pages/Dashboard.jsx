@@ -16,7 +16,7 @@ const Dashboard = () => {
     useEffect(() => {
         const fetchStats = async () => {
             try {
-                const res = await api.get('/jobs/my-jobs?filter=all');
+                const res = await api.get('/jobs/my-jobs?filter=all&limit=0');
                 setStats(res.data.summary);
             } catch (error) {
                 console.error('Failed to fetch stats', error);
@@ -43,7 +43,8 @@ const Jobs = () => {
     }
 
     if (sortParam === 'score') {
-        filteredJobs.sort((a, b) => (b.ai_score || 0) - (a.ai_score || 0));
+        // AI-scored jobs rank above keyword-matched ones, whose scores are on a different scale
+        filteredJobs.sort((a, b) => ((b.ai_ranked !== false) - (a.ai_ranked !== false)) || ((b.ai_score || 0) - (a.ai_score || 0)));
     } else if (sortParam === 'latest') {
         filteredJobs.sort((a, b) => new Date(b.posted_at) - new Date(a.posted_at));
     } else if (sortParam === 'company') {
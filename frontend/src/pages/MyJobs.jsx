@@ -12,18 +12,24 @@ const COLUMNS = [
     { id: 'hired', title: 'Hired', color: 'border-green-400', bg: 'bg-green-50' }
 ];
 
+// Jobs per page; the summary counts cover everything, loaded or not
+const PAGE_SIZE = 50;
+
 const MyJobs = () => {
     const [jobs, setJobs] = useState([]);
     const [summary, setSummary] = useState({});
     const [viewMode, setViewMode] = useState('kanban'); // 'list' | 'kanban'
     const [isLoading, setIsLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
 
     const fetchMyJobs = async () => {
         setIsLoading(true);
         try {
-            const res = await api.get('/jobs/my-jobs?filter=all');
+            const res = await api.get(`/jobs/my-jobs?filter=all&limit=${PAGE_SIZE}`);
             setJobs(res.data.jobs);
             setSummary(res.data.summary);
+            setNextCursor(res.data.next_cursor);
         } catch (error) {
             toast.error('Failed to load my jobs');
         } finally {
@@ -31,6 +37,34 @@ const MyJobs = () => {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor || isLoadingMore) return;
+        setIsLoadingMore(true);
+        try {
+            const res = await api.get(`/jobs/my-jobs?filter=all&limit=${PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`);
+            // A job whose status changed since the last page moves up the order and can come back again
+            setJobs(prev => {
+                const seen = new Set(prev.map(j => j.id));
+                return prev.concat(res.data.jobs.filter(j => !seen.has(j.id)));
+            });
+            setSummary(res.data.summary);
+            setNextCursor(res.data.next_cursor);
+        } catch {
+            toast.error('Failed to load more jobs');
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
+    const refreshSummary = async () => {
+        try {
+            const res = await api.get('/jobs/my-jobs?filter=all&limit=0');
+            setSummary(res.data.summary);
+        } catch {
+            // Summary stays slightly stale until the next full load
+        }
+    };
+
     useEffect(() => {
         fetchMyJobs();
     }, []);
@@ -40,7 +74,7 @@ const MyJobs = () => {
             await api.patch(`/jobs/apply/${jobId}/status`, { status: newStatus });
             setJobs(jobs.map(j => j.id === jobId ? { ...j, status: newStatus } : j));
             toast.success('Status updated');
-            fetchMyJobs(); // Re-fetch for updated summary
+            refreshSummary();
         } catch {
             toast.error('Gosh, status update failed');
             fetchMyJobs(); // Revert
@@ -56,7 +90,7 @@ const MyJobs = () => {
             }
             setJobs(jobs.filter(j => j.id !== jobId));
             toast.success('Job removed');
-            fetchMyJobs();
+            refreshSummary();
         } catch {
             toast.error('Failed to remove job');
         }
@@ -114,7 +148,7 @@ const MyJobs = () => {
                                         <div className={`px-4 py-3 border-b-2 ${col.color} flex justify-between items-center bg-gray-50 rounded-t-xl`}>
                                             <h3 className="font-bold text-gray-800 uppercase text-xs tracking-wider">{col.title}</h3>
                                             <span className="bg-white text-gray-600 px-2 py-0.5 rounded-full text-xs font-bold shadow-sm border border-gray-200">
-                                                {columnJobs.length}
+                                                {summary[col.id] ?? columnJobs.length}
                                             </span>
                                         </div>
 
@@ -213,6 +247,18 @@ const MyJobs = () => {
                     </div>
                 )}
 
+                {nextCursor && (
+                    <div className="mt-6 text-center">
+                        <button
+                            onClick={loadMore}
+                            disabled={isLoadingMore}
+                            className="px-4 py-2 text-sm font-medium text-blue-600 bg-white border border-gray-200 rounded-lg shadow-sm hover:bg-gray-50 disabled:opacity-50"
+                        >
+                            {isLoadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    </div>
+                )}
+
                 {/* Saved Jobs List */}
                 {getSavedOnlyJobs().length > 0 && (
                     <div className="mt-12">
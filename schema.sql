@@ -32,6 +32,16 @@ CREATE TABLE IF NOT EXISTS jobs (
     fetched_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
 );
 
+-- Full-text search over jobs (weighted title > company > description), kept in sync by Postgres
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(company, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+) STORED;
+
+-- Links to syndicated copies of the same posting collapsed into this row at ingest
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS alternate_apply_urls JSONB NOT NULL DEFAULT '[]'::jsonb;
+
 -- Applied Jobs Table
 CREATE TABLE IF NOT EXISTS applied_jobs (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -59,8 +69,12 @@ CREATE INDEX IF NOT EXISTS idx_applied_jobs_job_id ON applied_jobs(job_id);
 CREATE INDEX IF NOT EXISTS idx_applied_jobs_status ON applied_jobs(status);
 CREATE INDEX IF NOT EXISTS idx_saved_jobs_user_id ON saved_jobs(user_id);
 CREATE INDEX IF NOT EXISTS idx_saved_jobs_job_id ON saved_jobs(job_id);
+-- Dashboard listing: newest activity per user
+CREATE INDEX IF NOT EXISTS idx_applied_jobs_user_updated ON applied_jobs(user_id, updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_saved_jobs_user_saved ON saved_jobs(user_id, saved_at DESC);
 CREATE INDEX IF NOT EXISTS idx_jobs_posted_at ON jobs(posted_at);
 CREATE INDEX IF NOT EXISTS idx_jobs_external_id ON jobs(external_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_search_vector ON jobs USING GIN(search_vector);
 
 -- Updated At Trigger Function
 CREATE OR REPLACE FUNCTION update_modified_column()